@@ -5,13 +5,19 @@ warnings.filterwarnings("ignore")
 import pandas as pd
 import numpy as np
 import json
+from scipy.sparse import csr_matrix
+import io, os, glob, hashlib, threading
 
 # spacy
 import spacy
-from spacy.pipeline import EntityRuler
+import srsly
+from pathlib import Path
+from spacy.language import Language
 from spacy.lang.en import English
-from spacy.tokens import Doc
-from spacy.matcher import Matcher
+from spacy.tokens import Span
+
+from pdf_reader import pdf_miner, RESUME_DIR
+from cache_utils import DiskLRUCache, get_bytes_hash
 
 
 #################################################################
@@ -19,15 +25,34 @@ from spacy.matcher import Matcher
 #################################################################
 
 
+SKILLS_TXT_PATH = "../data/Skills_in_Demand.txt"
+SKILL_PATTERNS_PATH = "../data/Skill_patterns.jsonl"
+NLP_CACHE_DIR = "../data/nlp_cache"  # compiled skill rulers, one file per engine and skills list
+
+# Default skill engine (see Spacy_create_nlp): "light" returns the same skills as "lg"
+SPACY_ENGINE = "light"
+
+
+def read_skills_txt():
+    """Return the content of Skills_in_Demand.txt (str) and its hash (hex str)."""
+    with open(SKILLS_TXT_PATH, "rb") as file:
+        content = file.read()
+    skills_hash = hashlib.sha1(content).hexdigest()[:16]
+    try:
+        content = content.decode("utf-8")
+    except UnicodeDecodeError:
+        content = content.decode("cp1252")  # file saved with Windows encoding
+    return content, skills_hash
+
+
 def convect_skills_from_txt_to_Jsonl():
     """Convert skills (txt format) to patterns (jsonl format)"""
 
     # 1. Get list of skills from txt file
-    file_txt = open("../data/Skills_in_Demand.txt", "r")
+    content, _ = read_skills_txt()
     list_skills_in_demand = []
-    for x in file_txt.readlines():
+    for x in io.StringIO(content, newline=None).readlines():
         list_skills_in_demand.append(x.strip())
-    file_txt.close()
 
     # 2. Create the skill patterns
     rule_patterns = []
@@ -42,29 +67,148 @@ def convect_skills_from_txt_to_Jsonl():
         rule_patterns.append(json_string)
 
     # 3. Save patterns to jsonl file
-    file_jsonl = open("../data/Skill_patterns.jsonl", "w")
+    file_jsonl = open(SKILL_PATTERNS_PATH, "w")
     for k in range(len(rule_patterns)):
         file_jsonl.write(rule_patterns[k] + "\n")
     file_jsonl.close()
 
 
-def Spacy_create_nlp():
-    """create nlp ruler with Spacy"""
+class SkillMatcher:
+    """Lightweight alternative to the entity ruler for the skill patterns.
+    The patterns (sequences of LOWER tokens) are stored in a pure-Python token trie,
+    so each token only costs a few dict lookups, whatever the number of skills.
+    Overlapping matches are resolved like the entity ruler (longest match first,
+    then leftmost), so both return exactly the same SKILL entities.
+    """
 
-    # # some skills are mapped as orgnizations (like SQL, NOSQL...) --> remove ner
-    nlp = spacy.load("en_core_web_lg", disable=["ner"])
-    # nlp = spacy.load("en_core_web_lg")
+    def __init__(self):
+        self.trie = {}  # word --> sub-trie. The key None holds the label of a pattern.
+        self.patterns = []
+
+    def add_patterns(self, patterns):
+        """Add patterns like {"label": "SKILL", "pattern": [{"LOWER": "power"}, {"LOWER": "bi"}]}"""
+        for pattern in patterns:
+            node = self.trie
+            for token in pattern["pattern"]:
+                node = node.setdefault(token["LOWER"], {})
+            node[None] = pattern["label"]
+            self.patterns.append(pattern)
+
+    def match(self, doc):
+        """Return the matches (label, start, end), sorted like EntityRuler.match"""
+        words = [token.lower_ for token in doc]
+        matches = set()
+        for start in range(len(words)):
+            node = self.trie.get(words[start])
+            end = start + 1
+            while node is not None:
+                if None in node:
+                    matches.add((node[None], start, end))
+                if end == len(words):
+                    break
+                node = node.get(words[end])
+                end += 1
+        return sorted(matches, key=lambda m: (m[2] - m[1], -m[1]), reverse=True)
+
+    def __call__(self, doc):
+        entities = []
+        seen_tokens = set()
+        for label, start, end in self.match(doc):
+            if start not in seen_tokens and end - 1 not in seen_tokens:
+                entities.append(Span(doc, start, end, label=label))
+                seen_tokens.update(range(start, end))
+        doc.ents = entities
+        return doc
+
+    def to_bytes(self, exclude=tuple()):
+        return srsly.msgpack_dumps(self.patterns)
+
+    def from_bytes(self, bytes_data, exclude=tuple()):
+        self.trie, self.patterns = {}, []
+        self.add_patterns(srsly.msgpack_loads(bytes_data))
+        return self
+
+    def to_disk(self, path, exclude=tuple()):
+        path = Path(path)
+        if path.suffix != ".jsonl":
+            path.mkdir(parents=True, exist_ok=True)
+            path = path / "patterns.jsonl"
+        srsly.write_jsonl(path, self.patterns)
+
+    def from_disk(self, path, exclude=tuple()):
+        path = Path(path)
+        if path.suffix != ".jsonl":
+            path = path / "patterns.jsonl"
+        self.trie, self.patterns = {}, []
+        self.add_patterns(srsly.read_jsonl(path))
+        return self
+
+
+@Language.factory("skill_matcher")
+def create_skill_matcher(nlp, name):
+    return SkillMatcher()
+
+
+# Pipeline components labelling the skills (see Spacy_create_nlp)
+SKILL_COMPONENTS = ["entity_ruler", "skill_matcher"]
+
+
+def Spacy_create_nlp(engine=SPACY_ENGINE):
+    """create nlp ruler with Spacy
+    The compiled skill ruler is cached in NLP_CACHE_DIR, keyed by the engine and the
+    hash of Skills_in_Demand.txt: the patterns are only rebuilt when the skills change.
+    Inputs:
+        - engine (str):
+            "lg": en_core_web_lg pipeline + entity ruler.
+            "light": blank English tokenizer + skill_matcher (token trie).
+                     Same skills as "lg", without loading the en_core_web_lg model.
+    """
+    if engine == "light":
+        nlp = English()
+        skill_component = "skill_matcher"
+    else:
+        # # some skills are mapped as orgnizations (like SQL, NOSQL...) --> remove ner
+        nlp = spacy.load("en_core_web_lg", disable=["ner"])
+        # nlp = spacy.load("en_core_web_lg")
+        skill_component = "entity_ruler"
+
+    # Add the skill ruler (entity ruler or skill_matcher)
+    ruler = nlp.add_pipe(skill_component)
+
+    _, skills_hash = read_skills_txt()
+    cache_path = os.path.join(NLP_CACHE_DIR, f"{engine}-{skills_hash}.bin")
+    if os.path.exists(cache_path):
+        with open(cache_path, "rb") as file:
+            ruler.from_bytes(file.read())
+    else:
+        print("Create Spacy ruler...\n\n")
+        convect_skills_from_txt_to_Jsonl()  # create Skill_patterns.jsonl
+        ruler.from_disk(SKILL_PATTERNS_PATH)
+
+        # Save the compiled ruler and remove the outdated ones
+        os.makedirs(NLP_CACHE_DIR, exist_ok=True)
+        for old_cache_path in glob.glob(os.path.join(NLP_CACHE_DIR, f"{engine}-*.bin")):
+            os.remove(old_cache_path)
+        with open(cache_path, "wb") as file:
+            file.write(ruler.to_bytes())
+    # print(nlp.pipe_names, "\n\n")
+    return nlp
 
-    print("Create Spacy ruler...\n\n")
 
-    convect_skills_from_txt_to_Jsonl()  # create Skill_patterns.jsonl
-    skill_pattern_path = "../data/Skill_patterns.jsonl"
+# Process-wide nlp, shared by the Flask app and the scraper: engine --> (skills hash, nlp)
+_shared_nlp = {}
+_shared_nlp_lock = threading.Lock()
 
-    # Add entity ruler
-    ruler = nlp.add_pipe("entity_ruler")
-    ruler.from_disk(skill_pattern_path)
-    # print(nlp.pipe_names, "\n\n")
-    return nlp
+
+def get_nlp(engine=SPACY_ENGINE):
+    """Return the process-wide nlp of `engine`.
+    It is created once (see Spacy_create_nlp) and recreated only if the skills change.
+    """
+    _, skills_hash = read_skills_txt()
+    with _shared_nlp_lock:
+        if engine not in _shared_nlp or _shared_nlp[engine][0] != skills_hash:
+            _shared_nlp[engine] = (skills_hash, Spacy_create_nlp(engine))
+        return _shared_nlp[engine][1]
 
 
 ########################################################################
@@ -81,6 +225,43 @@ def get_skills(nlp, text):
     return list_skills
 
 
+def get_skill_entities(doc):
+    """SKILL entities of doc with their character offsets:
+    list of {"start": start_char, "end": end_char, "skill": skill (lowercase)}"""
+    return [
+        {"start": ent.start_char, "end": ent.end_char, "skill": ent.text.lower()}
+        for ent in doc.ents
+        if ent.label_ == "SKILL"
+    ]
+
+
+def get_skills_batch(nlp, texts, batch_size=256, n_process=1, return_spans=False):
+    """Batched version of get_skills, using nlp.pipe.
+    Only the skill entity ruler (or skill_matcher) is run: all the other components
+    of the pipeline (tok2vec, tagger, parser, lemmatizer...) are disabled.
+    Inputs:
+        - nlp: Spacy nlp containing the skill entity ruler (see Spacy_create_nlp).
+        - texts (iterable of str): texts to analyse.
+        - batch_size (int): number of texts processed per batch.
+        - n_process (int): number of processes (-1: use all the CPUs).
+        - return_spans (bool): also return the skill entities (see get_skill_entities).
+    Output:
+        - list of the skills found in each text.
+        - list of the skill entities of each text (if return_spans).
+    """
+    disable = [name for name in nlp.pipe_names if name not in SKILL_COMPONENTS]
+    list_skills, list_spans = [], []
+    for doc in nlp.pipe(
+        texts, batch_size=batch_size, n_process=n_process, disable=disable
+    ):
+        skill_spans = get_skill_entities(doc)
+        list_skills.append([span["skill"] for span in skill_spans])
+        list_spans.append(skill_spans)
+    if return_spans:
+        return list_skills, list_spans
+    return list_skills
+
+
 def unique_skills(list_skills):
     return list(set(list_skills))
 
@@ -91,11 +272,11 @@ def get_match_score(job_skills, your_skills):
     - Job_skills (list): list of required skills.
     - your_skills (str): your skills (comma separated)
     """
-    # convert your skills to list
-    list_your_skills = your_skills.split(",")
+    # convert your skills to list (lowercase)
+    list_your_skills = [str.lower(skill) for skill in your_skills.split(",")]
     score = 0
     for x in job_skills:
-        if x in your_skills:
+        if str.lower(x) in list_your_skills:
             score += 1
     job_skills_len = len(job_skills)
     try:
@@ -127,28 +308,291 @@ def get_missing_skills(list_job_skills, str_your_skills, return_list=True):
         return ",".join(missing_skills)  # return str
 
 
-def update_LinkedinJobs_DF(df, your_skills):
-    """update Jobs DF with your skills (precisely: match score and missing skills)"""
-    # 1. convert list to str to avoid error in np.vectorize
-    your_skills = ",".join(your_skills)
+########################################################################
+######    match scores over a sparse job x skill matrix
+########################################################################
+
 
-    # 2. create/update match score and missing skills columns
-    df["match_score"] = np.vectorize(get_match_score)(df["skills"], your_skills)
-    df["missing_skills"] = np.vectorize(get_missing_skills)(
-        df["skills"], your_skills, return_list=False
+def build_skill_matrix(list_job_skills):
+    """Encode the job skills as a CSR sparse matrix (jobs x skills).
+    Inputs:
+        - list_job_skills (iterable): list of skills of each job.
+    Output:
+        - skill_matrix (scipy CSR matrix): skill_matrix[i, j] = 1 if job i requires skill j.
+          The column indices of each row keep the order of the job skills.
+        - vocabulary (dict): skill --> column index.
+    """
+    vocabulary = {}
+    indices = []
+    indptr = [0]
+    for job_skills in list_job_skills:
+        for skill in job_skills:
+            indices.append(vocabulary.setdefault(str.lower(skill), len(vocabulary)))
+        indptr.append(len(indices))
+
+    skill_matrix = csr_matrix(
+        (np.ones(len(indices), dtype=np.int32), indices, indptr),
+        shape=(len(indptr) - 1, len(vocabulary)),
+    )
+    return skill_matrix, vocabulary
+
+
+def get_skills_vector(your_skills, vocabulary):
+    """Binary vector (over the skill vocabulary) of your skills."""
+    skills_vector = np.zeros(len(vocabulary), dtype=np.int32)
+    for skill in your_skills:
+        column = vocabulary.get(str.lower(skill))
+        if column is not None:
+            skills_vector[column] = 1
+    return skills_vector
+
+
+def build_resumes_matrix(list_resume_skills, vocabulary):
+    """Encode the skills of many resumes as a binary CSR matrix (resumes x skills),
+    over the skill vocabulary of the jobs (see build_skill_matrix)."""
+    rows, columns = [], []
+    for row, your_skills in enumerate(list_resume_skills):
+        resume_columns = {vocabulary.get(str.lower(skill)) for skill in your_skills}
+        resume_columns.discard(None)  # skills required by no job
+        rows += [row] * len(resume_columns)
+        columns += sorted(resume_columns)
+    return csr_matrix(
+        (np.ones(len(rows), dtype=np.int32), (rows, columns)),
+        shape=(len(list_resume_skills), len(vocabulary)),
     )
-    df = df.sort_values(by="match_score", ascending=False)
 
-    # 3. Saving data to json
-    df.to_json("../data/linkedin_jobs_scraped.json")
 
+def get_match_scores(skill_matrix, vocabulary, your_skills):
+    """Match score (%) of every job, computed with one sparse matrix-vector product.
+    Jobs without skills get NaN.
+    """
+    skills_vector = get_skills_vector(your_skills, vocabulary)
+    nb_matching_skills = skill_matrix @ skills_vector
+    nb_job_skills = np.diff(skill_matrix.indptr)
+    with np.errstate(divide="ignore", invalid="ignore"):
+        match_scores = np.round(nb_matching_skills / nb_job_skills * 100, 1)
+    match_scores[nb_job_skills == 0] = np.nan
+    return match_scores
+
+
+def get_all_missing_skills(skill_matrix, vocabulary, your_skills):
+    """Missing skills of every job (comma separated str): the job skill columns
+    that are not in your skills vector."""
+    skills_vector = get_skills_vector(your_skills, vocabulary)
+    list_skills = np.array(list(vocabulary), dtype=object)
+    is_missing = skills_vector[skill_matrix.indices] == 0
+    missing_skills = []
+    for start, end in zip(skill_matrix.indptr[:-1], skill_matrix.indptr[1:]):
+        columns = skill_matrix.indices[start:end][is_missing[start:end]]
+        missing_skills.append(",".join(list_skills[columns]))
+    return missing_skills
+
+
+def update_LinkedinJobs_DF(
+    df, your_skills, skill_matrix=None, vocabulary=None, sort=True
+):
+    """update Jobs DF with your skills (precisely: match score and missing skills)
+    Inputs:
+        - df (pandas DF): the scraped Linkedin jobs.
+        - your_skills (list): your skills.
+        - skill_matrix, vocabulary: encoded df["skills"] (see build_skill_matrix).
+                                    They are built from df if not provided.
+        - sort (bool): sort the jobs by match score (use rank_top_jobs to get only the top jobs).
+    """
+    # 1. encode the job skills as a sparse matrix (jobs x skills)
+    if skill_matrix is None:
+        skill_matrix, vocabulary = build_skill_matrix(df["skills"])
+
+    # 2. create/update match score and missing skills columns
+    df["match_score"] = get_match_scores(skill_matrix, vocabulary, your_skills)
+    df["missing_skills"] = get_all_missing_skills(
+        skill_matrix, vocabulary, your_skills
+    )
+    if sort:
+        df = df.sort_values(by="match_score", ascending=False)
+
+    # The scraped jobs are not saved: the scores of each resume are kept
+    # in a small cache by the Flask app (see get_resume_fingerprint).
     return df
 
 
+def get_resume_fingerprint(your_skills):
+    """Fingerprint of a resume: hash of its (unique, lowercase) skills.
+    The match scores and missing skills of a resume only depend on its skills."""
+    skills = sorted(set(str.lower(skill) for skill in your_skills))
+    return hashlib.sha1(",".join(skills).encode("utf-8")).hexdigest()[:16]
+
+
+########################################################################
+######    analyze a resume: text and skills, cached by pdf content
+########################################################################
+
+RESUME_CACHE_DIR = "../data/resume_cache"  # None: keep the analyzed resumes in memory only
+RESUME_PDF_MODE = "fast"  # text extraction mode of the resumes (see pdf_reader.PDF_MODES)
+
+# pdf content hash + skills hash --> {"resume_txt": str, "skills": list of unique skills}
+# Created on first use (see get_resume_analysis_cache): importing this module does not
+# create or prune RESUME_CACHE_DIR (e.g. in the scraper or the screening workers).
+_resume_analysis_cache = None
+_resume_analysis_cache_lock = threading.Lock()
+
+
+def get_resume_analysis_cache():
+    """Return the process-wide cache of the analyzed resumes (DiskLRUCache)."""
+    global _resume_analysis_cache
+    with _resume_analysis_cache_lock:
+        if _resume_analysis_cache is None:
+            _resume_analysis_cache = DiskLRUCache(maxsize=64, directory=RESUME_CACHE_DIR)
+        return _resume_analysis_cache
+
+
+def get_resume_key(file_name, resume_dir=None):
+    """Cache key of a resume: hash of the pdf content, extraction mode, skill engine and skills list."""
+    with open(os.path.join(resume_dir or RESUME_DIR, file_name), "rb") as file:
+        pdf_hash = get_bytes_hash(file.read())
+    _, skills_hash = read_skills_txt()
+    return f"{pdf_hash}-{RESUME_PDF_MODE}-{SPACY_ENGINE}-{skills_hash}"
+
+
+def extract_resume(file_name, nlp=None, resume_dir=None):
+    """Extract the text of a resume and its skills (unique, lowercase), without cache.
+    Output: {"resume_txt": str, "skills": list}
+    """
+    if nlp is None:
+        nlp = get_nlp()
+    resume_txt = pdf_miner(file_name, mode=RESUME_PDF_MODE, resume_dir=resume_dir)
+    list_your_skills = list(set(get_skills(nlp, resume_txt)))  # remove dupplications
+    return {"resume_txt": resume_txt, "skills": list_your_skills}
+
+
+def analyze_resume(file_name, nlp, cache=None, resume_dir=None):
+    """Extract the text of a resume (pdf saved in ../resume/) and its skills (unique, lowercase).
+    The result is cached by the content of the pdf (not its name) and the skills list:
+    analyzing the same resume again skips the pdf parsing and Spacy.
+    cache: None: shared cache (see get_resume_analysis_cache), False: no cache.
+    Output: resume_txt (str), list_your_skills (list)
+    """
+    if cache is None:
+        cache = get_resume_analysis_cache()
+    elif cache is False:
+        cache = None
+    key = get_resume_key(file_name, resume_dir)
+    entry = cache.get(key) if cache is not None else None
+    if entry is None:
+        entry = extract_resume(file_name, nlp, resume_dir)
+        if cache is not None:
+            cache.put(key, entry)
+    return entry["resume_txt"], list(entry["skills"])
+
+
+########################################################################
+######    rank the jobs: top-K partial selection
+########################################################################
+
+
+def get_top_k_positions(scores, k, offset=0):
+    """Positions of the jobs ranked offset+1 .. offset+k by decreasing score.
+    NaN scores are ranked last and ties are ranked by position, like a stable sort.
+    The best (offset + k) jobs are selected in O(N) with np.partition,
+    and only them are sorted (O(K log K)).
+    """
+    scores = np.asarray(scores, dtype=float)
+    nb_jobs = len(scores)
+    end = min(offset + k, nb_jobs)
+    if end <= offset:
+        return np.array([], dtype=int)
+
+    keys = np.where(np.isnan(scores), -np.inf, scores)
+    if end < nb_jobs:
+        kth_score = np.partition(keys, nb_jobs - end)[nb_jobs - end]
+        better = np.flatnonzero(keys > kth_score)
+        ties = np.flatnonzero(keys == kth_score)[: end - len(better)]
+        positions = np.concatenate([better, ties])
+    else:
+        positions = np.arange(nb_jobs)
+
+    # sort by decreasing score, then by position
+    positions = positions[np.lexsort((positions, -keys[positions]))]
+    return positions[offset:end]
+
+
+def rank_top_jobs(df, scores, k, cursor=None, score_column=None):
+    """Return one page of the jobs ranked by decreasing score.
+    Inputs:
+        - df (pandas DF): the jobs.
+        - scores (array): score of each job (same order as df).
+        - k (int): number of jobs per page.
+        - cursor (str): cursor of the page (None: first page).
+        - score_column (str): if provided, the scores of the page are added to top_df.
+    Output:
+        - top_df (pandas DF): the k jobs of the page (materialized once).
+        - next_cursor (str): cursor of the next page (None if it is the last page).
+    """
+    try:
+        offset = max(int(cursor), 0)
+    except (TypeError, ValueError):
+        offset = 0
+    positions = get_top_k_positions(scores, k, offset)
+    top_df = df.iloc[positions]
+    if score_column is not None:
+        top_df = top_df.assign(**{score_column: np.asarray(scores)[positions]})
+
+    next_cursor = None
+    if offset + k < len(df):
+        next_cursor = str(offset + k)
+    return top_df, next_cursor
+
+
+def get_top_k_matches(skill_matrix, vocabulary, list_resume_skills, k, block_size=None):
+    """Top-k matching jobs of many resumes at once (bulk screening).
+    The numbers of matching skills are computed by blocks of resumes with one matrix
+    product (jobs x skills) @ (skills x resumes), and the top-k of all the resumes of a
+    block are selected together with np.argpartition. Only the jobs sharing at least
+    one skill with a resume are ranked (the other ones score 0).
+    Inputs:
+        - block_size (int): number of resumes per block (default: about 4M scores per block).
+    Output: list (one item per resume) of (positions of the top jobs, their match scores),
+            ranked like get_top_k_positions (ties are ranked by job position).
+    """
+    nb_jobs = skill_matrix.shape[0]
+    nb_job_skills = np.diff(skill_matrix.indptr)
+    resumes_matrix = build_resumes_matrix(list_resume_skills, vocabulary)
+    if block_size is None:
+        block_size = max(1, 4_000_000 // max(nb_jobs, 1))
+    k = min(k, nb_jobs)
+
+    # ranking key of a (job, resume) pair: score * nb_jobs + (nb_jobs - 1 - job position),
+    # i.e. higher score first, then lower job position. The score only depends on the
+    # numbers of job skills and of matching skills: it is read in a table.
+    max_skills = int(nb_job_skills.max()) if nb_jobs else 0
+    nb_skills, nb_matching = np.indices((max_skills + 1, max_skills + 1))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        score_table = np.round(nb_matching / nb_skills * 100, 1)  # same as get_match_scores
+    key_table = np.rint(np.nan_to_num(score_table) * 10).astype(np.int64) * nb_jobs
+    key_table[:, 0] = -nb_jobs - 1  # no matching skill: negative key, not ranked
+    reversed_positions = np.arange(nb_jobs - 1, -1, -1)
+
+    top_matches = []
+    for start in range(0, len(list_resume_skills), block_size):
+        block = resumes_matrix[start : start + block_size].T.toarray()
+        nb_matching_skills = (skill_matrix @ block).T  # resumes of the block x jobs
+        keys = key_table[nb_job_skills, nb_matching_skills]
+        keys += reversed_positions
+        if k < nb_jobs:
+            top = np.argpartition(keys, nb_jobs - k, axis=1)[:, nb_jobs - k :]
+        else:
+            top = np.tile(np.arange(nb_jobs), (keys.shape[0], 1))
+        for row in range(keys.shape[0]):
+            positions = top[row][np.argsort(-keys[row, top[row]])]
+            positions = positions[keys[row, positions] >= 0]
+            scores = score_table[nb_job_skills[positions], nb_matching_skills[row, positions]]
+            top_matches.append((positions, scores))
+    return top_matches
+
+
 #################################################################################
 #   display the job and highlight the skills you do and you do not have
 #################################################################################
-from spacy.matcher import Matcher
 
 
 def get_pattern(skill, rule_based_matching="LOWER"):
@@ -167,39 +611,104 @@ def get_pattern(skill, rule_based_matching="LOWER"):
     return pattern
 
 
-def get_matchers(list_skills, missing_skills, spacy_nlp):
-    # 1. Initialize the matchers with the spaCy vocabulary
-    list_missing_skills = missing_skills
-    matcher_OK = Matcher(spacy_nlp.vocab)  # you have this skill
-    matcher_NOK = Matcher(spacy_nlp.vocab)  # you do not have this skill
-
-    # 2. Add patterns
-    for k, skill in enumerate(list_skills):
-        # print(k, skill)
-        pattern = get_pattern(skill)
-        # print(k, pattern)
-
-        if skill in list_missing_skills:
-            matcher_NOK.add(f"rule_{k}", [pattern])  # you do not have this skill
-        else:
-            matcher_OK.add(f"rule_{k}", [pattern])  # you have this skill
-
-    return matcher_OK, matcher_NOK
-
-
-def get_indexes(list_matches):
-    """Get word indexes in the Spacy nlp document.
-    We will leverage the list_matches, which contains the list of all matches.
-    For each match, the output has three elements.
-    - The first element is the match ID.
-    - The second and third elements are the positions of the matched tokens."""
-    list_indexes = []
-    for match in list_matches:
-        start_index = match[1]
-        end_index = match[2]
-        for k in range(start_index, end_index):
-            list_indexes.append(k)
-    return list_indexes
+# Labels of the words of a job description
+WORD_TYPES = ["other", "SKILL", "SKILL-missing"]
+
+# One matcher shared by all requests: the skills are added on demand, one rule per
+# skill (keyed by the skill), in a token trie (see SkillMatcher).
+_highlight_matcher = SkillMatcher()
+_highlight_skills = set()  # skills already added to _highlight_matcher
+_highlight_matcher_lock = threading.Lock()
+
+
+def get_highlight_matcher(list_skills):
+    """Return the shared skill matcher, after adding the skills it does not know yet."""
+    with _highlight_matcher_lock:
+        new_skills = set(list_skills) - _highlight_skills
+        _highlight_matcher.add_patterns(
+            [{"label": skill, "pattern": get_pattern(skill)} for skill in new_skills]
+        )
+        _highlight_skills.update(new_skills)
+    return _highlight_matcher
+
+
+def get_word_labels(doc, list_required_skills, list_missing_skills):
+    """Label each token of doc in a single pass over the skill matches:
+    0: other, 1: SKILL (you have it), 2: SKILL-missing (index in WORD_TYPES).
+    A token matched by a missing skill is labelled SKILL-missing."""
+    required_skills = set(list_required_skills)
+    missing_skills = set(list_missing_skills)
+    matcher = get_highlight_matcher(required_skills)
+
+    labels = np.zeros(len(doc), dtype=np.int8)
+    for skill, start, end in matcher.match(doc):
+        if skill in required_skills:
+            label = 2 if skill in missing_skills else 1
+            labels[start:end] = np.maximum(labels[start:end], label)
+    return labels
+
+
+def get_skill_spans(job_txt, list_required_skills, list_missing_skills, spacy_nlp):
+    """Returns the merged skill spans of job_txt: list of (start_char, end_char, type)
+    where type is "SKILL" or "SKILL-missing". Consecutive tokens with the same type
+    are merged into one span. Only the tokenizer is run."""
+    doc = spacy_nlp.make_doc(job_txt)
+    labels = get_word_labels(doc, list_required_skills, list_missing_skills)
+
+    spans = []
+    # boundaries of the runs of identical labels
+    boundaries = np.flatnonzero(np.diff(labels)) + 1
+    for start, end in zip(
+        np.concatenate([[0], boundaries]), np.concatenate([boundaries, [len(doc)]])
+    ):
+        if end > start and labels[start] > 0:
+            last_token = doc[end - 1]
+            spans.append(
+                (
+                    doc[start].idx,
+                    last_token.idx + len(last_token),
+                    WORD_TYPES[labels[start]],
+                )
+            )
+    return spans
+
+
+def split_skill_spans(skill_spans, list_missing_skills):
+    """Per-resume split of the skill entities stored at scraping time (no NLP):
+    returns the list of (start_char, end_char, type), type: "SKILL" or "SKILL-missing"."""
+    missing_skills = set(list_missing_skills)
+    return [
+        (
+            span["start"],
+            span["end"],
+            "SKILL-missing" if span["skill"] in missing_skills else "SKILL",
+        )
+        for span in skill_spans
+    ]
+
+
+def get_text_segments(job_txt, spans):
+    """Run-length segments of job_txt: cut the text along the spans
+    (start_char, end_char, type), sorted by start_char.
+    Returns the list of (text, type): the text between the spans is one "other" segment,
+    consecutive segments with the same type are merged."""
+    segments = []
+
+    def add_segment(text, word_type):
+        if segments and segments[-1][1] == word_type:
+            segments[-1] = (segments[-1][0] + text, word_type)
+        elif text:
+            segments.append((text, word_type))
+
+    position = 0
+    for start, end, word_type in spans:
+        if start < position:  # overlapping span
+            continue
+        add_segment(job_txt[position:start], "other")
+        add_segment(job_txt[start:end], word_type)
+        position = end
+    add_segment(job_txt[position:], "other")
+    return segments
 
 
 def return_words_types(job_txt, list_required_skills, list_missing_skills, spacy_nlp):
@@ -207,41 +716,10 @@ def return_words_types(job_txt, list_required_skills, list_missing_skills, spacy
     - list of words
     - list of the corresponding types (skill, missing skill, other words)"""
 
-    Job_doc_nlp = spacy_nlp(job_txt)
-
-    # create matchers
-    matcher_OK, matcher_NOK = get_matchers(
-        list_required_skills, list_missing_skills, spacy_nlp
-    )
-
-    # Get list of matches
-    list_matches_OK = matcher_OK(Job_doc_nlp)
-    list_matches_NOK = matcher_NOK(Job_doc_nlp)
-
-    # Get index of words using matcher_OK (ie. you have the skill)
-    indexes_SKILLS_OK = get_indexes(list_matches_OK)
-    # Get index of words using matcher_NOK (ie. you do not have the skill)
-    indexes_SKILLS_NOK = get_indexes(list_matches_NOK)
+    Job_doc_nlp = spacy_nlp.make_doc(job_txt)  # only the tokenizer is needed
+    labels = get_word_labels(Job_doc_nlp, list_required_skills, list_missing_skills)
 
-    # Get index of other words (not Skills)
-    indexes_others = []
-
-    for k, word in enumerate(Job_doc_nlp):
-        if (k in indexes_SKILLS_OK) | (k in indexes_SKILLS_NOK):
-            pass
-        else:
-            indexes_others.append(k)
-
-    words = []
-    types = []
-
-    for k, word in enumerate(Job_doc_nlp):
-        words.append(word)
-        if k in indexes_SKILLS_NOK:
-            types.append("SKILL-missing")
-        elif k in indexes_SKILLS_OK:
-            types.append("SKILL")
-        else:
-            types.append("other")
+    words = list(Job_doc_nlp)
+    types = [WORD_TYPES[label] for label in labels]
 
     return words, types
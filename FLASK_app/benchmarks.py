@@ -0,0 +1,1357 @@
+"""Micro-benchmarks and checks of the scraping and matching code.
+
+Run the following command in the FLASK_app's directory:
+    python benchmarks.py <benchmark> [arguments]
+
+Example:
+    python benchmarks.py parsing ../data/html_fixtures
+
+The checks (check_...) run the code against local stub servers and temporary
+stores (no network): they exit with an error if a check fails.
+"""
+import os, sys, time, glob, shutil, contextlib
+import warnings
+
+import pandas as pd
+from bs4 import BeautifulSoup
+from spacy.lang.en import English
+
+warnings.filterwarnings("ignore")
+
+
+#################################################################
+########        Helpers
+#################################################################
+
+
+def timeit(func, *args, repeat=3, **kwargs):
+    """Return the best elapsed time (seconds) of `repeat` calls and the last result."""
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args, **kwargs)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best, result
+
+
+def read_scraped_jobs():
+    """Read the scraped Linkedin jobs (used to build realistic benchmark data)."""
+    return pd.read_json(
+        "../data/linkedin_jobs_scraped.json",
+        convert_dates=["posted_date", "scraping_date"],
+    )
+
+
+#################################################################
+########        1. Parsing of the job postings
+#################################################################
+
+POSTING_HTML_TEMPLATE = """<html><head><style>.top-card-layout{{margin:0}}</style>
+<script type="application/ld+json">{{"@type": "JobPosting"}}</script></head>
+<body><section class="top-card-layout container-lined overflow-hidden">
+<div class="top-card-layout__card relative p-2 papabear:p-details-container-padding">
+<a href="https://www.linkedin.com/company/{Job_ID}" class="top-card-layout__card-link">
+<img class="artdeco-entity-image" alt="{company}" src="logo.png"></a>
+<div class="top-card-layout__entity-info flex-grow flex-shrink-0 basis-0">
+<a href="https://www.linkedin.com/jobs/view/{Job_ID}" class="topcard__link">
+<h2 class="top-card-layout__title topcard__title">{job_title}</h2></a>
+<h4 class="top-card-layout__second-subline">
+<span class="topcard__flavor topcard__flavor--bullet">{location}</span>
+<span class="posted-time-ago__text topcard__flavor--metadata">{posted_time_ago}</span>
+{applicants}
+</h4></div></div></section>
+<section class="description"><div class="show-more-less-html__markup">{paragraphs}</div>
+<ul class="description__job-criteria-list">
+<li class="description__job-criteria-item"><h3>Seniority level</h3><span>{level}</span></li>
+<li class="description__job-criteria-item"><h3>Employment type</h3><span>Full-time</span></li>
+</ul></section></body></html>"""
+
+APPLICANTS_HTML = """<span class="num-applicants__caption topcard__flavor--metadata topcard__flavor--bullet">{nb_candidats} applicants</span>"""
+
+
+def make_posting_html(job):
+    """Build the html of a Linkedin job posting (guest API markup) from a scraped job."""
+    sentences = str(job["Job_txt"]).split(". ")
+    paragraphs = "".join(f"<p>{sentence}.</p>" for sentence in sentences)
+    # nb_candidats is a float in the scraped jobs (NaN if unknown): "29 applicants",
+    # no element if unknown (like the postings without this detail)
+    applicants = ""
+    if not pd.isnull(job["nb_candidats"]):
+        applicants = APPLICANTS_HTML.format(nb_candidats=int(job["nb_candidats"]))
+    return POSTING_HTML_TEMPLATE.format(
+        Job_ID=job["Job_ID"],
+        company=job["company"],
+        job_title=job["job-title"],
+        location=job["location"],
+        posted_time_ago=job["posted-time-ago"],
+        applicants=applicants,
+        level=job["level"],
+        paragraphs=paragraphs,
+    )
+
+
+def save_html_fixtures(list_job_IDs, fixtures_dir="../data/html_fixtures"):
+    """Download job postings and save their html (one <Job_ID>.html file per posting)."""
+    from job_fetcher import fetch_job_postings
+
+    os.makedirs(fixtures_dir, exist_ok=True)
+    for Job_ID, html in fetch_job_postings(list_job_IDs):
+        if html is not None:
+            with open(os.path.join(fixtures_dir, f"{Job_ID}.html"), "w") as file:
+                file.write(html)
+
+
+def load_html_fixtures(fixtures_dir=None):
+    """Return a list of (Job_ID, html).
+    The html files are read from fixtures_dir if provided, otherwise they are
+    built from the scraped jobs (../data/linkedin_jobs_scraped.json).
+    """
+    if fixtures_dir is not None:
+        fixtures = []
+        for path in sorted(glob.glob(os.path.join(fixtures_dir, "*.html"))):
+            with open(path, "r") as file:
+                Job_ID = os.path.splitext(os.path.basename(path))[0]
+                fixtures.append((Job_ID, file.read()))
+        return fixtures
+
+    df = read_scraped_jobs()
+    return [(job["Job_ID"], make_posting_html(job)) for _, job in df.iterrows()]
+
+
+def parse_Job_posting_two_pass(Job_ID, html):
+    """Previous parser: two BeautifulSoup parses and one soup.find per Job detail."""
+    from scraping_linkedin import remove_tags
+
+    job = {}
+    soup = BeautifulSoup(html, "html.parser")
+    job["Job_ID"] = Job_ID
+    try:
+        job["Job_txt"] = remove_tags(html)
+    except:
+        job["Job_txt"] = None
+    try:
+        job["company"] = (
+            soup.find("div", {"class": "top-card-layout__card"})
+            .find("a")
+            .find("img")
+            .get("alt")
+        )
+    except:
+        job["company"] = None
+    try:
+        job["job-title"] = (
+            soup.find("div", {"class": "top-card-layout__entity-info"})
+            .find("a")
+            .text.strip()
+        )
+    except:
+        job["job-title"] = None
+    try:
+        job["level"] = (
+            soup.find("ul", {"class": "description__job-criteria-list"})
+            .find("li")
+            .text.replace("Seniority level", "")
+            .strip()
+        )
+    except:
+        job["level"] = None
+    try:
+        job["location"] = soup.find(
+            "span", {"class": "topcard__flavor topcard__flavor--bullet"}
+        ).text.strip()
+    except:
+        job["location"] = None
+    try:
+        job["posted-time-ago"] = soup.find(
+            "span", {"class": "posted-time-ago__text topcard__flavor--metadata"}
+        ).text.strip()
+    except:
+        job["posted-time-ago"] = None
+    try:
+        nb_candidats = soup.find(
+            "span",
+            {
+                "class": "num-applicants__caption topcard__flavor--metadata topcard__flavor--bullet"
+            },
+        ).text.strip()
+        job["nb_candidats"] = int(nb_candidats.split()[0])
+    except:
+        job["nb_candidats"] = None
+    return job
+
+
+def bench_parsing(fixtures_dir=None, repeat=3):
+    """Postings/sec of the two-pass parser (before) and the single-pass parser (after)."""
+    from scraping_linkedin import parse_Job_posting
+
+    repeat = int(repeat)
+    fixtures = load_html_fixtures(fixtures_dir)
+    print(f"Parsing {len(fixtures)} job postings (best of {repeat}):")
+
+    results = {}
+    for name, parser in [
+        ("before (two-pass, html.parser)", parse_Job_posting_two_pass),
+        ("after (single-pass, lxml)", parse_Job_posting),
+    ]:
+        elapsed, jobs = timeit(
+            lambda: [parser(Job_ID, html) for Job_ID, html in fixtures], repeat=repeat
+        )
+        results[name] = jobs
+        print(f"  {name:32s} {len(fixtures) / elapsed:10.1f} postings/sec")
+
+    before, after = results.values()
+    nb_diff = sum(job_before != job_after for job_before, job_after in zip(before, after))
+    print(f"  postings with different details: {nb_diff}")
+
+
+#################################################################
+########        2. Skill extraction engines
+#################################################################
+
+
+def create_ruler_nlp_blank():
+    """Entity ruler on a blank English pipeline (same skill patterns as "lg", without the model)."""
+    nlp = English()
+    ruler = nlp.add_pipe("entity_ruler")
+    ruler.from_disk("../data/Skill_patterns.jsonl")
+    return nlp
+
+
+def create_reference_nlp(reference="auto"):
+    """Reference skill pipeline of the "light" engine: (name, nlp).
+    Inputs:
+        - reference (str): "lg": en_core_web_lg + entity_ruler (the "lg" engine),
+                           "ruler": blank English + entity_ruler (same skill patterns),
+                           "auto": "lg" if en_core_web_lg is installed, otherwise "ruler".
+    """
+    import spacy
+    from Spacy_text_analayzer import Spacy_create_nlp
+
+    installed = spacy.util.is_package("en_core_web_lg")
+    if reference == "auto":
+        reference = "lg" if installed else "ruler"
+        if not installed:
+            print("en_core_web_lg is not installed: the reference is blank English + entity_ruler.")
+    if reference == "lg":
+        if not installed:
+            sys.exit("en_core_web_lg is not installed (python -m spacy download en_core_web_lg).")
+        nlp = Spacy_create_nlp(engine="lg")
+        return f"en_core_web_lg {nlp.meta['version']} + entity_ruler", nlp
+    return "blank English + entity_ruler", create_ruler_nlp_blank()
+
+
+def bench_engines(nb_jobs=100, reference="auto"):
+    """Startup time and throughput of the reference ("lg") and "light" skill engines
+    (see check_parity for the parity of their skills)."""
+    from Spacy_text_analayzer import Spacy_create_nlp, get_skills_batch
+
+    nb_jobs = int(nb_jobs)
+    texts = read_scraped_jobs()["Job_txt"].str.lower()[:nb_jobs].to_list()
+    nb_tokens = sum(len(English().make_doc(text)) for text in texts)
+    print(f"Extracting skills from {len(texts)} jobs ({nb_tokens} tokens):")
+
+    engines = [
+        ("reference", lambda: create_reference_nlp(reference)),
+        ("light", lambda: ("light (blank English + skill_matcher)", Spacy_create_nlp(engine="light"))),
+    ]
+    for _, create_nlp in engines:
+        startup, (name, nlp) = timeit(create_nlp, repeat=1)
+        elapsed, _ = timeit(get_skills_batch, nlp, texts, repeat=1)
+        print(f"  {name}")
+        print(
+            f"    startup: {startup:7.2f} s"
+            f"   throughput: {nb_tokens / elapsed:12.0f} tokens/sec"
+        )
+
+
+#################################################################
+########        3. Storage of the scraped jobs
+#################################################################
+
+
+def make_jobs_DF(nb_jobs):
+    """Return nb_jobs synthetic jobs, sampled from the scraped jobs."""
+    df = read_scraped_jobs()
+    df = df.sample(n=nb_jobs, replace=True, random_state=0).reset_index(drop=True)
+    df["Job_ID"] = range(nb_jobs)
+    return df
+
+
+def get_rss():
+    """Resident memory of the current process (MB, Linux only)."""
+    with open("/proc/self/status") as file:
+        for line in file:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1]) / 1024
+    return 0
+
+
+def measure_load(backend_name, path, columns, queue):
+    """Load the jobs in a fresh process; put (elapsed, RSS increase in MB) in queue."""
+    from job_store import create_backend
+
+    # load an empty store first: the libraries of the backend (e.g. pyarrow) are
+    # imported before the RSS is measured
+    create_backend(backend_name, os.path.join(path, "missing")).load(columns)
+    backend = create_backend(backend_name, path)
+    rss_before = get_rss()
+    start = time.perf_counter()
+    df = backend.load(columns)
+    elapsed = time.perf_counter() - start
+    queue.put((elapsed, get_rss() - rss_before))
+
+
+def bench_storage(sizes="10000,100000"):
+    """Save/load time and RSS of the json and parquet backends (full and projected loads)."""
+    import tempfile
+    import multiprocessing
+    from job_store import create_backend
+    from plotly_figures import DASHBOARD_COLUMNS
+
+    context = multiprocessing.get_context("spawn")
+    tmp_dir = tempfile.mkdtemp()
+    for nb_jobs in [int(size) for size in str(sizes).split(",")]:
+        df = make_jobs_DF(nb_jobs)
+        print(f"{nb_jobs} jobs:")
+        for backend_name, file_name in [
+            ("json", "jobs.json"),
+            ("parquet", "jobs.parquet"),
+        ]:
+            path = os.path.join(tmp_dir, f"{nb_jobs}_{file_name}")
+            save_time, _ = timeit(create_backend(backend_name, path).save, df, repeat=1)
+            print(f"  {backend_name:8s} save: {save_time:7.2f} s")
+            for load_name, columns in [("all", None), ("dashboard", DASHBOARD_COLUMNS)]:
+                queue = context.Queue()
+                process = context.Process(
+                    target=measure_load, args=(backend_name, path, columns, queue)
+                )
+                process.start()
+                load_time, rss = queue.get()
+                process.join()
+                print(
+                    f"  {backend_name:8s} load ({load_name} columns): {load_time:7.2f} s"
+                    f"   RSS: +{rss:7.1f} MB"
+                )
+    shutil.rmtree(tmp_dir)
+
+
+#################################################################
+########        4. Match scores
+#################################################################
+
+
+def get_match_score_substring(job_skills, your_skills):
+    """Previous match score: substring test against the comma-joined skills."""
+    score = sum(1 for x in job_skills if x in your_skills)
+    try:
+        return round(score / len(job_skills) * 100, 1)
+    except:
+        return None
+
+
+def bench_scoring(nb_jobs=100000, repeat=3):
+    """Time to score every job: np.vectorize (before) vs sparse matrix-vector product (after)."""
+    import numpy as np
+    from Spacy_text_analayzer import (
+        build_skill_matrix,
+        get_match_scores,
+        get_all_missing_skills,
+        get_missing_skills,
+    )
+
+    nb_jobs, repeat = int(nb_jobs), int(repeat)
+    df = make_jobs_DF(nb_jobs)
+    your_skills = ["python", "sql", "r", "machine learning", "power bi", "excel"]
+    str_your_skills = ",".join(your_skills)
+    print(f"Scoring {nb_jobs} jobs (best of {repeat}):")
+
+    elapsed, _ = timeit(
+        np.vectorize(get_match_score_substring), df["skills"], str_your_skills,
+        repeat=repeat,
+    )
+    print(f"  before: match scores (np.vectorize)     {elapsed * 1000:9.1f} ms")
+    elapsed, _ = timeit(
+        np.vectorize(get_missing_skills), df["skills"], str_your_skills,
+        return_list=False, repeat=repeat,
+    )
+    print(f"  before: missing skills (np.vectorize)   {elapsed * 1000:9.1f} ms")
+
+    elapsed, (skill_matrix, vocabulary) = timeit(
+        build_skill_matrix, df["skills"], repeat=repeat
+    )
+    print(f"  after:  build the skill matrix (once)   {elapsed * 1000:9.1f} ms")
+    elapsed, _ = timeit(
+        get_match_scores, skill_matrix, vocabulary, your_skills, repeat=repeat
+    )
+    print(f"  after:  match scores (sparse mat-vec)   {elapsed * 1000:9.1f} ms")
+    elapsed, _ = timeit(
+        get_all_missing_skills, skill_matrix, vocabulary, your_skills, repeat=repeat
+    )
+    print(f"  after:  missing skills (column indices) {elapsed * 1000:9.1f} ms")
+
+
+#################################################################
+########        5. Highlighting of the skills in a job description
+#################################################################
+
+
+def return_words_types_matchers(job_txt, list_required_skills, list_missing_skills, spacy_nlp):
+    """Previous labelling: full pipeline, two Matchers built per call, `k in list` scans."""
+    from spacy.matcher import Matcher
+    from Spacy_text_analayzer import get_pattern
+
+    Job_doc_nlp = spacy_nlp(job_txt)
+    matcher_OK = Matcher(spacy_nlp.vocab)
+    matcher_NOK = Matcher(spacy_nlp.vocab)
+    for k, skill in enumerate(list_required_skills):
+        if skill in list_missing_skills:
+            matcher_NOK.add(f"rule_{k}", [get_pattern(skill)])
+        else:
+            matcher_OK.add(f"rule_{k}", [get_pattern(skill)])
+
+    indexes_OK, indexes_NOK = [], []
+    for _, start, end in matcher_OK(Job_doc_nlp):
+        indexes_OK.extend(range(start, end))
+    for _, start, end in matcher_NOK(Job_doc_nlp):
+        indexes_NOK.extend(range(start, end))
+
+    words, types = [], []
+    for k in range(len(Job_doc_nlp)):
+        words.append(Job_doc_nlp[k])
+        if k in indexes_NOK:
+            types.append("SKILL-missing")
+        elif k in indexes_OK:
+            types.append("SKILL")
+        else:
+            types.append("other")
+    return words, types
+
+
+def bench_labeling(nb_tokens="10000,50000", repeat=3):
+    """Time to label the words of long job descriptions: before vs after."""
+    from Spacy_text_analayzer import get_nlp, return_words_types, get_skill_spans
+
+    repeat = int(repeat)
+    df = read_scraped_jobs()
+    nlp = get_nlp()
+    your_skills = ["python", "sql", "r", "machine learning", "power bi", "excel"]
+
+    for size in [int(size) for size in nb_tokens.split(",")]:
+        # concatenate job descriptions until the text has `size` tokens
+        texts, skills, nb = [], [], 0
+        for job_txt, job_skills in zip(df["Job_txt"], df["skills"]):
+            texts.append(job_txt)
+            skills.extend(job_skills)
+            nb += len(nlp.make_doc(job_txt))
+            if nb >= size:
+                break
+        job_txt = " ".join(texts)
+        required_skills = list(dict.fromkeys(skills))
+        missing_skills = [s for s in required_skills if s not in your_skills]
+        nb = len(nlp.make_doc(job_txt))
+        print(f"{nb} tokens, {len(required_skills)} skills (best of {repeat}):")
+
+        elapsed, before = timeit(
+            return_words_types_matchers, job_txt, required_skills, missing_skills, nlp,
+            repeat=repeat,
+        )
+        print(f"  before: two Matchers + list scans  {elapsed * 1000:9.1f} ms")
+        elapsed, after = timeit(
+            return_words_types, job_txt, required_skills, missing_skills, nlp,
+            repeat=repeat,
+        )
+        print(f"  after:  shared matcher + labels    {elapsed * 1000:9.1f} ms")
+        elapsed, spans = timeit(
+            get_skill_spans, job_txt, required_skills, missing_skills, nlp,
+            repeat=repeat,
+        )
+        print(f"  after:  merged spans               {elapsed * 1000:9.1f} ms ({len(spans)} spans)")
+        same = before[1] == after[1] and [w.text for w in before[0]] == [
+            w.text for w in after[0]
+        ]
+        print(f"  same words and types: {same}")
+
+
+#################################################################
+########        6. Rendering of the highlighted job description
+#################################################################
+
+# Previous loop of display_Job.html: one element and three `if` per token
+HIGHLIGHT_TEMPLATE_TOKENS = """
+    <p>
+        {% for k in range(nb_words) %}
+        {% if types[k] =="SKILL-missing" %}
+        <span style="font-size:medium;background-color: rgb(239,59,44);color: white;">
+            {{words[k]}}
+        </span>
+        {% endif %}
+        {% if types[k] =="SKILL" %}
+        <span style="font-size:medium;background-color:rgb(33,113,181) ;color: white;">
+            {{words[k]}}
+        </span>
+        {% endif %}
+        {% if types[k] =="other" %}
+        <span>
+            {{words[k]}}
+        </span>
+        {% endif %}
+        {% endfor %}
+    </p>"""
+
+
+def get_template_block(template_path, start="    <p>\n        {% for", end="</p>"):
+    """Return the highlight loop of a template file (from `start` to `end`)."""
+    with open(template_path) as f:
+        source = f.read()
+    begin = source.index(start)
+    return source[begin : source.index(end, begin) + len(end)]
+
+
+def bench_render(nb_jobs=50, repeat=3):
+    """Template time and html bytes of the highlighted job descriptions:
+    per-token loop (before) vs run-length (text, type) segments (after)."""
+    from jinja2 import Environment
+    from Spacy_text_analayzer import (
+        get_nlp,
+        return_words_types,
+        get_skill_spans,
+        get_text_segments,
+    )
+
+    nb_jobs, repeat = int(nb_jobs), int(repeat)
+    df = read_scraped_jobs().head(nb_jobs)
+    nlp = get_nlp()
+    your_skills = ["python", "sql", "r", "machine learning", "power bi", "excel"]
+    env = Environment(autoescape=True)  # like Flask for the .html templates
+    template_tokens = env.from_string(HIGHLIGHT_TEMPLATE_TOKENS)
+    template_segments = env.from_string(
+        get_template_block("templates/display_Job.html")
+    )
+
+    list_words_types, list_segments = [], []
+    for job_txt, skills in zip(df["Job_txt"], df["skills"]):
+        missing_skills = [skill for skill in skills if skill not in your_skills]
+        list_words_types.append(
+            return_words_types(job_txt, skills, missing_skills, nlp)
+        )
+        spans = get_skill_spans(job_txt, skills, missing_skills, nlp)
+        list_segments.append(get_text_segments(job_txt, spans))
+
+    def render_tokens():
+        return [
+            template_tokens.render(words=words, types=types, nb_words=len(words))
+            for words, types in list_words_types
+        ]
+
+    def render_segments():
+        return [template_segments.render(segments=segments) for segments in list_segments]
+
+    print(f"Rendering {len(df)} job descriptions (best of {repeat}):")
+    elapsed, html = timeit(render_tokens, repeat=repeat)
+    nb_bytes = sum(len(page.encode()) for page in html)
+    nb_items = sum(len(words) for words, _ in list_words_types)
+    print(
+        f"  before: per-token loop  {elapsed * 1000 / len(df):7.2f} ms/job "
+        f"{nb_bytes / len(df) / 1024:8.1f} KB/job ({nb_items / len(df):.0f} tokens/job)"
+    )
+    elapsed, html = timeit(render_segments, repeat=repeat)
+    nb_bytes = sum(len(page.encode()) for page in html)
+    nb_items = sum(len(segments) for segments in list_segments)
+    print(
+        f"  after:  segments        {elapsed * 1000 / len(df):7.2f} ms/job "
+        f"{nb_bytes / len(df) / 1024:8.1f} KB/job ({nb_items / len(df):.0f} segments/job)"
+    )
+
+
+#################################################################
+########        7. Waiting for the pages of search results
+#################################################################
+
+# Static page of search results: the jobs are added one by one, every `delay` ms,
+# like the lazily loaded list of Linkedin.
+RESULTS_PAGE_TEMPLATE = """<html><body>
+<ul id="jobs"></ul>
+<script>
+var nb_jobs = {nb_jobs}, n = 0;
+function add_job() {{
+    if (n >= nb_jobs) return;
+    var li = document.createElement("li");
+    li.className = "jobs-search-results__list-item";
+    li.setAttribute("data-occludable-job-id", String(3700000000 + n));
+    li.style.height = "200px";
+    document.getElementById("jobs").appendChild(li);
+    n += 1;
+    setTimeout(add_job, {delay});
+}}
+setTimeout(add_job, {delay});
+</script>
+</body></html>"""
+
+
+def save_results_page_fixtures(list_nb_jobs, delay=50, fixtures_dir="../data/page_fixtures"):
+    """Save one static page of search results per number of jobs; return their paths."""
+    os.makedirs(fixtures_dir, exist_ok=True)
+    list_paths = []
+    for page_num, nb_jobs in enumerate(list_nb_jobs):
+        path = os.path.abspath(os.path.join(fixtures_dir, f"page-{page_num}.html"))
+        with open(path, "w") as f:
+            f.write(RESULTS_PAGE_TEMPLATE.format(nb_jobs=nb_jobs, delay=delay))
+        list_paths.append(path)
+    return list_paths
+
+
+def bench_page_wait(nb_jobs="25,25,25,10", sleep_time=120, delay=50):
+    """Time waited per page of search results (local fixtures, headless Chrome):
+    fixed sleep of sleep_time seconds (before) vs adaptive wait (after)."""
+    from selenium import webdriver
+    from scraping_linkedin import wait_for_jobs, find_Job_Ids
+
+    list_nb_jobs = [int(nb) for nb in nb_jobs.split(",")]
+    list_paths = save_results_page_fixtures(list_nb_jobs, delay=int(delay))
+
+    options = webdriver.ChromeOptions()
+    options.add_argument("--headless=new")
+    try:
+        driver = webdriver.Chrome(options=options)
+    except Exception as e:
+        print("Headless Chrome could not be started:", e)
+        return
+
+    total_time = 0
+    for path, nb in zip(list_paths, list_nb_jobs):
+        driver.get("file://" + path)
+        metrics = wait_for_jobs(driver, timeout=float(sleep_time))
+        nb_found = len(find_Job_Ids(BeautifulSoup(driver.page_source, "html.parser")))
+        total_time += metrics["elapsed"]
+        print(f"  {os.path.basename(path)}: {nb} jobs, {nb_found} found, {metrics}")
+    driver.quit()
+
+    nb_pages = len(list_paths)
+    print(f"before: fixed sleep {nb_pages * float(sleep_time):8.1f} s for {nb_pages} pages")
+    print(f"after:  adaptive    {total_time:8.1f} s for {nb_pages} pages")
+
+
+#################################################################
+########        8. Scraping pipeline: materialized vs streaming
+#################################################################
+
+
+def start_posting_server(jobs_DF, failures=None, delay=0):
+    """Serve the html of the jobs (guest API markup) on a local port, in a thread.
+    Inputs:
+        - failures (dict): Job_ID (str) --> list of (status code, Retry-After header or None)
+                           answered to the first requests of this job, before the posting.
+        - delay (seconds): time taken by each response (to observe concurrent requests).
+    Return the server and the url template of a job posting. server.requests lists the
+    requests received: (start time (time.monotonic), Job_ID, status code), and
+    server.max_active is the largest number of requests served at the same time.
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    jobs = {str(job["Job_ID"]): job for _, job in jobs_DF.iterrows()}
+    failures = {Job_ID: list(responses) for Job_ID, responses in (failures or {}).items()}
+    lock = threading.Lock()
+    active = [0]
+
+    class PostingHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            start = time.monotonic()
+            Job_ID = self.path.rsplit("/", 1)[-1]
+            with lock:
+                active[0] += 1
+                server.max_active = max(server.max_active, active[0])
+                failure = failures[Job_ID].pop(0) if failures.get(Job_ID) else None
+            try:
+                time.sleep(delay)
+                job = jobs.get(Job_ID)
+                if failure is not None:
+                    status, retry_after = failure
+                    self.send_response(status)
+                    if retry_after is not None:
+                        self.send_header("Retry-After", str(retry_after))
+                    self.send_header("Content-Length", "0")
+                    self.end_headers()
+                elif job is None:
+                    status = 404
+                    self.send_response(404)
+                    self.end_headers()
+                else:
+                    status = 200
+                    body = make_posting_html(job).encode("utf-8")
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html; charset=utf-8")
+                    self.send_header("Content-Length", str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+            finally:
+                with lock:
+                    active[0] -= 1
+                    server.requests.append((start, Job_ID, status))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), PostingHandler)
+    server.requests, server.max_active = [], 0
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/jobPosting/{{}}"
+
+
+def bench_pipeline(sizes="500,2000", chunk_size=100):
+    """Time and peak Python memory (tracemalloc) of scraping + preprocessing N postings
+    served locally: whole DF in memory (before) vs streaming by chunks to a parquet store (after)."""
+    import tempfile
+    import tracemalloc
+    import job_store
+    from scraping_linkedin import scrape_Job_details, Preprocess_data, scrape_and_store_jobs
+    from Spacy_text_analayzer import get_nlp
+
+    get_nlp()  # load the Spacy model before measuring
+    tmp_dir = tempfile.mkdtemp()
+    stored_backend = job_store.job_store.backend
+    for nb_jobs in [int(size) for size in str(sizes).split(",")]:
+        df = make_jobs_DF(nb_jobs)
+        server, job_url = start_posting_server(df)
+        list_job_IDs = df["Job_ID"].to_list()
+        del df
+        print(f"{nb_jobs} postings:")
+
+        def materialized():
+            jobs_DF = scrape_Job_details(list_job_IDs, job_url=job_url, requests_per_second=0)
+            return len(Preprocess_data(jobs_DF))
+
+        def streaming():
+            job_store.job_store.backend = job_store.create_backend(
+                "parquet", os.path.join(tmp_dir, f"{nb_jobs}_jobs.parquet")
+            )
+            try:
+                return scrape_and_store_jobs(
+                    list_job_IDs,
+                    chunk_size=int(chunk_size),
+                    job_url=job_url,
+                    requests_per_second=0,
+                    staging_path=os.path.join(tmp_dir, f"{nb_jobs}_staging.parquet"),
+                )
+            finally:
+                job_store.job_store.backend = stored_backend
+                job_store.job_store.invalidate()
+
+        for name, func in [("before (materialized)", materialized), ("after (streaming)", streaming)]:
+            tracemalloc.start()
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                elapsed, nb_stored = timeit(func, repeat=1)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            print(
+                f"  {name:22s}: {elapsed:7.2f} s   peak memory: {peak / 1e6:7.1f} MB"
+                f"   ({nb_stored} jobs)"
+            )
+        server.shutdown()
+    shutil.rmtree(tmp_dir)
+
+
+#################################################################
+########        9. Text extraction of the resumes (pdf)
+#################################################################
+
+
+def escape_pdf_string(text):
+    return text.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)")
+
+
+def make_resume_pdf(path, nb_pages=2, lines_per_page=45, seed=0):
+    """Write a minimal pdf resume (Helvetica, nb_pages pages) mentioning random skills.
+    Half of the lines are written at once (with space characters), the other half
+    word by word at computed positions (no space characters), like many pdf generators.
+    Return the list of the skills written in the resume.
+    """
+    import random
+    from pdfminer.fontmetrics import FONT_METRICS
+    from Spacy_text_analayzer import read_skills_txt
+
+    widths = FONT_METRICS["Helvetica"][1]  # character --> width (1/1000 of the font size)
+
+    content, _ = read_skills_txt()
+    list_skills = [skill.strip() for skill in content.splitlines() if skill.strip()]
+    rng = random.Random(seed)
+    skills_written = []
+
+    objects = {}  # number --> bytes
+    page_numbers = []
+    for page_num in range(nb_pages):
+        commands = ["BT", "/F1 10 Tf"]
+        for line_num in range(lines_per_page):
+            skills = rng.sample(list_skills, 3)
+            skills_written += skills
+            line = f"Experience with {skills[0]}, {skills[1]} and {skills[2]} in production."
+            y = 780 - 16 * line_num
+            if line_num % 2 == 0:
+                commands.append(f"1 0 0 1 50 {y} Tm ({escape_pdf_string(line)}) Tj")
+            else:
+                x = 50
+                for word in line.split(" "):
+                    commands.append(f"1 0 0 1 {x:.2f} {y} Tm ({escape_pdf_string(word)}) Tj")
+                    x += sum(widths.get(char, 556) for char in word + " ") / 100
+        commands.append("ET")
+        stream = "\n".join(commands).encode("latin-1", errors="replace")
+        page_obj, content_obj = 4 + 2 * page_num, 5 + 2 * page_num
+        page_numbers.append(page_obj)
+        objects[page_obj] = (
+            f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] "
+            f"/Resources << /Font << /F1 3 0 R >> >> /Contents {content_obj} 0 R >>"
+        ).encode()
+        objects[content_obj] = (
+            f"<< /Length {len(stream)} >>\nstream\n".encode() + stream + b"\nendstream"
+        )
+    objects[1] = b"<< /Type /Catalog /Pages 2 0 R >>"
+    kids = " ".join(f"{num} 0 R" for num in page_numbers)
+    objects[2] = f"<< /Type /Pages /Kids [{kids}] /Count {nb_pages} >>".encode()
+    objects[3] = b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"
+
+    pdf = b"%PDF-1.4\n"
+    offsets = []
+    for num in range(1, len(objects) + 1):
+        offsets.append(len(pdf))
+        pdf += f"{num} 0 obj\n".encode() + objects[num] + b"\nendobj\n"
+    xref_offset = len(pdf)
+    pdf += f"xref\n0 {len(objects) + 1}\n0000000000 65535 f \n".encode()
+    pdf += "".join(f"{offset:010d} 00000 n \n" for offset in offsets).encode()
+    pdf += (
+        f"trailer\n<< /Size {len(objects) + 1} /Root 1 0 R >>\n"
+        f"startxref\n{xref_offset}\n%%EOF\n"
+    ).encode()
+    with open(path, "wb") as f:
+        f.write(pdf)
+    return skills_written
+
+
+def bench_pdf(nb_pages="1,4,16,30", n_process=4, repeat=3):
+    """Text extraction time of generated resumes: layout analysis (before) vs fast mode
+    (after), sequential and with the pages split between n_process processes.
+    Parity: skills found in the text of each mode vs the layout mode."""
+    import tempfile
+    import pdf_reader
+    from Spacy_text_analayzer import get_nlp, get_skills
+
+    nlp = get_nlp()
+    tmp_dir = tempfile.mkdtemp()
+    resume_dir = pdf_reader.RESUME_DIR
+    pdf_reader.RESUME_DIR = tmp_dir + "/"
+    try:
+        for nb in [int(nb) for nb in str(nb_pages).split(",")]:
+            file_name = f"resume_{nb}_pages.pdf"
+            make_resume_pdf(os.path.join(tmp_dir, file_name), nb_pages=nb)
+            print(f"{nb} pages ({os.path.getsize(os.path.join(tmp_dir, file_name)) // 1024} KB):")
+            layout_skills = None
+            for name, kwargs in [
+                ("layout", {"mode": "layout"}),
+                ("fast", {"mode": "fast"}),
+                (f"fast, {n_process} processes", {"mode": "fast", "n_process": int(n_process)}),
+            ]:
+                elapsed, resume_txt = timeit(
+                    pdf_reader.pdf_miner, file_name, max_pages=0, repeat=int(repeat), **kwargs
+                )
+                skills = set(get_skills(nlp, resume_txt))
+                if layout_skills is None:
+                    layout_skills = skills
+                print(
+                    f"  {name:20s}: {elapsed * 1000:8.1f} ms   {len(skills)} skills"
+                    f"   parity: {len(skills & layout_skills)}/{len(layout_skills | skills)}"
+                )
+    finally:
+        pdf_reader.RESUME_DIR = resume_dir
+        shutil.rmtree(tmp_dir)
+
+
+#################################################################
+########        10. Bulk screening of resumes
+#################################################################
+
+
+def bench_screening(nb_jobs=100000, nb_resumes=200, k=10, repeat=3):
+    """Time to rank the jobs for many resumes: one sparse mat-vec product and top-k
+    per resume, like N /go_analyzer requests (before) vs one resumes x jobs
+    sparse matrix product (after). The skill extraction of the resumes is not timed."""
+    import random
+    from Spacy_text_analayzer import (
+        build_skill_matrix,
+        get_match_scores,
+        get_top_k_positions,
+        get_top_k_matches,
+    )
+
+    nb_jobs, nb_resumes, k, repeat = int(nb_jobs), int(nb_resumes), int(k), int(repeat)
+    skill_matrix, vocabulary = build_skill_matrix(make_jobs_DF(nb_jobs)["skills"])
+    rng = random.Random(0)
+    list_resume_skills = [
+        rng.sample(list(vocabulary), rng.randint(5, 30)) for _ in range(nb_resumes)
+    ]
+    print(f"Ranking {nb_jobs} jobs for {nb_resumes} resumes, top {k} (best of {repeat}):")
+
+    def one_by_one():
+        top_matches = []
+        for your_skills in list_resume_skills:
+            scores = get_match_scores(skill_matrix, vocabulary, your_skills)
+            positions = get_top_k_positions(scores, k)
+            top_matches.append((positions, scores[positions]))
+        return top_matches
+
+    elapsed, before = timeit(one_by_one, repeat=repeat)
+    print(f"  before: one resume at a time   {elapsed * 1000:9.1f} ms")
+    elapsed, after = timeit(
+        get_top_k_matches, skill_matrix, vocabulary, list_resume_skills, k, repeat=repeat
+    )
+    print(f"  after:  resumes x jobs product {elapsed * 1000:9.1f} ms")
+
+    # parity: same top jobs (the jobs without any matching skill are not ranked)
+    nb_diff = 0
+    for (positions, scores), (top_positions, top_scores) in zip(before, after):
+        keep = scores > 0
+        if list(positions[keep]) != list(top_positions) or list(scores[keep]) != list(top_scores):
+            nb_diff += 1
+    print(f"  resumes with different top jobs (parity): {nb_diff}")
+
+
+#################################################################
+########        11. Best candidates of a job (reverse matching)
+#################################################################
+
+
+def bench_candidates(nb_candidates=100000, nb_jobs=50, k=10, repeat=3):
+    """Time to find the best candidates of a job: get_match_score for every candidate
+    of the pool (before) vs the inverted index skill --> candidates (after).
+    The skills of the candidates are sampled from the scraped jobs."""
+    import tempfile
+    from resume_screening import CandidateIndex
+    from Spacy_text_analayzer import get_match_score
+
+    nb_candidates, nb_jobs, k, repeat = int(nb_candidates), int(nb_jobs), int(k), int(repeat)
+    candidate_index = CandidateIndex(os.path.join(tempfile.mkdtemp(), "candidates.json"))
+    elapsed, _ = timeit(
+        lambda: [
+            candidate_index.add_candidate(f"candidate_{i}", skills)
+            for i, skills in enumerate(make_jobs_DF(nb_candidates)["skills"])
+        ],
+        repeat=1,
+    )
+    print(f"{nb_candidates} candidates ({elapsed:.1f} s to index them), {nb_jobs} jobs, top {k}:")
+    list_job_skills = [
+        skills for skills in read_scraped_jobs()["skills"] if len(skills) > 0
+    ][:nb_jobs]
+
+    def before():
+        list_top = []
+        for job_skills in list_job_skills:
+            scores = [
+                (-get_match_score(job_skills, ",".join(skills)), candidate_id)
+                for candidate_id, skills in candidate_index.candidates.items()
+            ]
+            list_top.append([(c, -s) for s, c in sorted(scores)[:k] if s < 0])
+        return list_top
+
+    def after():
+        return [
+            [(c, score) for c, score, _ in candidate_index.match_job(job_skills, k)]
+            for job_skills in list_job_skills
+        ]
+
+    elapsed, list_top_before = timeit(before, repeat=1)
+    print(f"  before: score every candidate   {elapsed / nb_jobs * 1000:9.2f} ms per job")
+    elapsed, list_top_after = timeit(after, repeat=repeat)
+    print(f"  after:  inverted index          {elapsed / nb_jobs * 1000:9.2f} ms per job")
+    nb_diff = sum(a != b for a, b in zip(list_top_before, list_top_after))
+    print(f"  jobs with different top candidates (parity): {nb_diff}")
+
+    # cost of a query vs size of the pool
+    nb_postings = [
+        sum(len(candidate_index._postings.get(str.lower(skill), ())) for skill in job_skills)
+        for job_skills in list_job_skills
+    ]
+    print(
+        f"  postings read per job: {sum(nb_postings) / nb_jobs:9.0f}"
+        f" (pool: {nb_candidates} candidates)"
+    )
+
+
+#################################################################
+########        12. Dashboard pages
+#################################################################
+
+
+def bench_dashboard(nb_hits=200):
+    """Time per hit of the dashboard page: plotly graphs encoded in JSON and page
+    rendered at each hit (before) vs dashboard cache (after), and 304 Not Modified."""
+    import json
+    import plotly
+    from flask import render_template
+    import run
+    from job_store import get_jobs_DF
+    from plotly_figures import return_plots_dashboard, DASHBOARD_COLUMNS
+
+    nb_hits = int(nb_hits)
+    graphs_dahboard = return_plots_dashboard(get_jobs_DF(columns=DASHBOARD_COLUMNS))
+    client = run.app.test_client()
+    print(f"Dashboard page, {nb_hits} hits:")
+
+    def before():
+        for _ in range(nb_hits):
+            with run.app.test_request_context("/dashboard"):
+                ids = ["graph-{}".format(i) for i, _ in enumerate(graphs_dahboard)]
+                graphJSON = json.dumps(graphs_dahboard, cls=plotly.utils.PlotlyJSONEncoder)
+                render_template("dashboard.html", ids=ids, graphJSON=graphJSON)
+
+    def after():
+        for _ in range(nb_hits):
+            with run.app.test_request_context("/dashboard"):
+                dashboard = run.dashboard_cache.get()
+                render_template(
+                    "dashboard.html", ids=dashboard["ids"], graphJSON=dashboard["graphJSON"]
+                )
+
+    def requests(headers=None):
+        for _ in range(nb_hits):
+            client.get("/dashboard", headers=headers)
+
+    print(f"  graphs: {len(json.dumps(graphs_dahboard, cls=plotly.utils.PlotlyJSONEncoder)) // 1024} KB of JSON")
+    elapsed, _ = timeit(before)
+    print(f"  before: encode + render          {elapsed / nb_hits * 1000:7.3f} ms per hit")
+    elapsed, _ = timeit(after)
+    print(f"  after:  cache + render           {elapsed / nb_hits * 1000:7.3f} ms per hit")
+    elapsed, _ = timeit(requests)
+    print(f"  after:  full request (200)       {elapsed / nb_hits * 1000:7.3f} ms per hit")
+    etag = client.get("/dashboard").headers["ETag"]
+    elapsed, _ = timeit(requests, {"If-None-Match": etag})
+    print(f"  after:  full request (304)       {elapsed / nb_hits * 1000:7.3f} ms per hit")
+
+
+#################################################################
+########        13. Checks (local stub servers, temporary stores)
+#################################################################
+
+
+def check(condition, message):
+    """Print the result of a check; exit with an error if it failed."""
+    print(f"  [{'ok' if condition else 'FAILED'}] {message}")
+    if not condition:
+        sys.exit(f"Check failed: {message}")
+
+
+@contextlib.contextmanager
+def temporary_store(backend="json"):
+    """Use an empty job store (temporary directory) instead of the scraped jobs."""
+    import tempfile
+    import job_store
+
+    tmp_dir = tempfile.mkdtemp()
+    stored_backend = job_store.job_store.backend
+    job_store.job_store.backend = job_store.create_backend(
+        backend, os.path.join(tmp_dir, f"jobs.{backend}")
+    )
+    job_store.job_store.invalidate()
+    try:
+        yield tmp_dir
+    finally:
+        job_store.job_store.backend = stored_backend
+        job_store.job_store.invalidate()
+        shutil.rmtree(tmp_dir)
+
+
+def check_incremental(nb_jobs=20):
+    """Incremental scraping (--incremental) on a fresh install: empty store, no index."""
+    from job_store import get_jobs_DF
+    from scraping_linkedin import update_jobs_incremental
+
+    df = make_jobs_DF(int(nb_jobs)).drop_duplicates("Job_ID")
+    server, job_url = start_posting_server(df)
+    list_job_IDs = df["Job_ID"].to_list()
+    print(f"Incremental scraping of {len(list_job_IDs)} jobs into an empty store:")
+    with temporary_store("json") as tmp_dir:
+        seen_jobs_path = os.path.join(tmp_dir, "seen_jobs.json")
+        check(get_jobs_DF(columns=["Job_ID", "Job_txt"]).columns.to_list() == ["Job_ID", "Job_txt"],
+              "an empty store returns the requested columns")
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            jobs_DF = update_jobs_incremental(
+                list_job_IDs, seen_jobs_path=seen_jobs_path, job_url=job_url, requests_per_second=0
+            )
+        check(len(jobs_DF) == len(list_job_IDs), "first run: all the jobs are downloaded")
+        check(sorted(get_jobs_DF()["Job_ID"]) == sorted(list_job_IDs), "first run: all the jobs are stored")
+        with contextlib.redirect_stdout(open(os.devnull, "w")):
+            jobs_DF = update_jobs_incremental(
+                list_job_IDs, seen_jobs_path=seen_jobs_path, job_url=job_url, requests_per_second=0
+            )
+        check(jobs_DF.empty, "second run: no job downloaded again")
+    server.shutdown()
+
+
+def check_streaming(nb_jobs=120, chunk_size=25):
+    """Streaming scraping stopped after a few chunks (e.g. cancelled), then started again:
+    the stored jobs are unchanged meanwhile and only the remaining jobs are downloaded."""
+    from job_store import get_jobs_DF, save_jobs_DF
+    from scraping_linkedin import scrape_and_store_jobs
+
+    df = make_jobs_DF(int(nb_jobs)).drop_duplicates("Job_ID")
+    server, job_url = start_posting_server(df)
+    list_job_IDs = df["Job_ID"].to_list()
+    chunk_size = int(chunk_size)
+    print(f"Streaming scraping of {len(list_job_IDs)} jobs, stopped then resumed:")
+    for backend in ["json", "parquet"]:
+        with temporary_store(backend) as tmp_dir:
+            staging_path = os.path.join(tmp_dir, "staging.parquet")
+            save_jobs_DF(df.iloc[:3])  # jobs of a previous scraping
+            fetched = []
+
+            def stop_after_two_chunks(postings_fetched=None, postings_processed=None):
+                if postings_fetched is not None:
+                    fetched.append(postings_fetched)
+                if postings_processed is not None and postings_processed >= 2 * chunk_size:
+                    raise KeyboardInterrupt
+
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                try:
+                    scrape_and_store_jobs(
+                        list_job_IDs, chunk_size=chunk_size, job_url=job_url, requests_per_second=0,
+                        progress=stop_after_two_chunks, staging_path=staging_path,
+                    )
+                except KeyboardInterrupt:
+                    pass
+            check(len(get_jobs_DF()) == 3, f"{backend}: stopped, the stored jobs are unchanged")
+
+            fetched.clear()
+            with contextlib.redirect_stdout(open(os.devnull, "w")):
+                nb_stored = scrape_and_store_jobs(
+                    list_job_IDs, chunk_size=chunk_size, job_url=job_url, requests_per_second=0,
+                    progress=lambda postings_fetched=None, **kwargs: fetched.append(postings_fetched),
+                    staging_path=staging_path,
+                )
+            nb_fetched = max(nb for nb in fetched if nb is not None)
+            check(nb_fetched <= len(list_job_IDs) - 2 * chunk_size,
+                  f"{backend}: resumed, only the {nb_fetched} remaining jobs downloaded")
+            check(nb_stored == len(list_job_IDs)
+                  and sorted(get_jobs_DF()["Job_ID"]) == sorted(list_job_IDs),
+                  f"{backend}: all the jobs are stored")
+            check(not os.path.exists(staging_path), f"{backend}: staging area deleted")
+    server.shutdown()
+
+
+def check_fetcher(nb_jobs=40):
+    """Concurrent download of the job postings (job_fetcher.py): concurrency, per-host
+    rate limit, retries with backoff on 429/5xx (Retry-After), and the jobs DF of
+    scrape_Job_details when some requests had to be retried."""
+    from job_fetcher import fetch_job_postings
+    from scraping_linkedin import scrape_Job_details, JOB_DETAILS_GETTERS
+
+    df = make_jobs_DF(int(nb_jobs)).drop_duplicates("Job_ID")
+    list_job_IDs = df["Job_ID"].to_list()
+    print(f"Download of {len(list_job_IDs)} job postings from a local stub server:")
+
+    # 1. Concurrency: max_workers requests at the same time, results in the input order
+    server, job_url = start_posting_server(df, delay=0.05)
+    results = list(fetch_job_postings(list_job_IDs, job_url=job_url, max_workers=4, requests_per_second=0))
+    check([Job_ID for Job_ID, _ in results] == list_job_IDs, "postings returned in the order of the Job IDs")
+    check(all(html is not None for _, html in results), "all the postings downloaded")
+    check(1 < server.max_active <= 4, f"{server.max_active} concurrent requests (max_workers=4)")
+    server.shutdown()
+
+    # 2. Rate limit: requests spaced by 1 / requests_per_second, whatever the number of workers
+    server, job_url = start_posting_server(df.iloc[:10])
+    list(fetch_job_postings(list_job_IDs[:10], job_url=job_url, max_workers=4, requests_per_second=20))
+    starts = sorted(start for start, _, _ in server.requests)
+    min_gap = min(b - a for a, b in zip(starts, starts[1:]))
+    check(min_gap >= 0.04, f"requests spaced by at least {min_gap * 1000:.0f} ms (20 requests/sec)")
+    server.shutdown()
+
+    # 3. Retries: 429 with Retry-After, 5xx errors, and a posting that always fails
+    Job_ID_429, Job_ID_5xx, Job_ID_failed = [str(Job_ID) for Job_ID in list_job_IDs[:3]]
+    failures = {
+        Job_ID_429: [(429, 0.3)],
+        Job_ID_5xx: [(503, None), (500, None)],
+        Job_ID_failed: [(502, None)] * 10,
+    }
+    server, job_url = start_posting_server(df, failures=failures)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        retried_DF = scrape_Job_details(
+            list_job_IDs, job_url=job_url, max_workers=4, requests_per_second=0,
+            max_retries=2, backoff_factor=0.01,
+        )
+    requests_of = lambda Job_ID: sorted(
+        (start, status) for start, Job_ID_request, status in server.requests if Job_ID_request == Job_ID
+    )
+    (start_429, _), (start_retry, status_retry) = requests_of(Job_ID_429)
+    check(status_retry == 200 and start_retry - start_429 >= 0.3, "429: retried after Retry-After (0.3 s)")
+    check([status for _, status in requests_of(Job_ID_5xx)] == [503, 500, 200], "503, 500: retried until 200")
+    check(len(requests_of(Job_ID_failed)) == 3, "always 502: 1 + max_retries attempts, then skipped")
+    server.shutdown()
+
+    # 4. Same jobs DF as without failures (except the posting that always failed)
+    server, job_url = start_posting_server(df)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        jobs_DF = scrape_Job_details(list_job_IDs, job_url=job_url, requests_per_second=0)
+    server.shutdown()
+    check(jobs_DF.columns.to_list() == ["Job_ID", "Job_txt"] + list(JOB_DETAILS_GETTERS),
+          "scrape_Job_details columns")
+    expected_DF = jobs_DF[jobs_DF["Job_ID"].astype(str) != Job_ID_failed].reset_index(drop=True)
+    check(retried_DF.equals(expected_DF), "with retries: same jobs DF (without the failed posting)")
+
+
+def start_search_server(list_job_IDs, page_size=10, overlap=2, failures=None):
+    """Serve pages of guest search results (job cards) on a local port, in a thread.
+    The page `start` lists the jobs start-overlap .. start+page_size-overlap-1 (the
+    `overlap` last jobs of the previous page again, like results moving between two
+    requests). Pages after the last job are empty.
+    Inputs:
+        - failures (dict): start --> list of (status code, Retry-After header or None)
+                           answered to the first requests of this page.
+    Return the server and the url template of a page of results (keywords, location, start).
+    server.requests lists the requests received: (start, status code).
+    """
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+    from urllib.parse import urlparse, parse_qs
+
+    failures = {start: list(responses) for start, responses in (failures or {}).items()}
+    lock = threading.Lock()
+
+    class SearchHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            start = int(parse_qs(urlparse(self.path).query)["start"][0])
+            with lock:
+                failure = failures[start].pop(0) if failures.get(start) else None
+            if failure is not None:
+                status, retry_after = failure
+                self.send_response(status)
+                if retry_after is not None:
+                    self.send_header("Retry-After", str(retry_after))
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+            else:
+                status = 200
+                page = list_job_IDs[max(0, start - overlap) : start + page_size - overlap]
+                cards = "".join(
+                    f'<li><div class="base-card" data-entity-urn="urn:li:jobPosting:{Job_ID}">'
+                    f"<h3>Job {Job_ID}</h3></div></li>"
+                    for Job_ID in page
+                )
+                body = cards.encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", "text/html; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+            with lock:
+                server.requests.append((start, status))
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), SearchHandler)
+    server.requests = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/search?keywords={{}}&location={{}}&start={{}}"
+    return server, url
+
+
+def check_guest_search(nb_jobs=57, page_size=10):
+    """Job IDs discovery with the guest search API (no browser) against local search pages:
+    paging, overlapping pages, 429 retry, stop on the empty page and at max_jobs."""
+    import tempfile
+    from scraping_linkedin import scraping_Job_Ids_guest
+
+    nb_jobs, page_size = int(nb_jobs), int(page_size)
+    list_job_IDs = [str(3700000000 + 17 * k) for k in range(nb_jobs)]
+    tmp_dir = tempfile.mkdtemp()
+    job_ids_path = os.path.join(tmp_dir, "Job_Ids.csv")
+    print(f"Guest search of {nb_jobs} jobs ({page_size} job cards per page, overlapping pages):")
+
+    server, search_url = start_search_server(
+        list_job_IDs, page_size=page_size, failures={page_size - 2: [(429, 0.1)]}
+    )
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        found = scraping_Job_Ids_guest(
+            "data scientist", "Paris", search_url=search_url, requests_per_second=0,
+            backoff_factor=0.01, job_ids_path=job_ids_path,
+        )
+    check(found == list_job_IDs, f"{len(found)} Job IDs, in order, without duplicates")
+    check(pd.read_csv(job_ids_path, dtype=str).Job_Id.to_list() == found, "Job IDs saved to the csv file")
+    statuses = [status for start, status in server.requests if start == page_size - 2]
+    check(statuses == [429, 200], "page answered 429: retried")
+    starts = sorted(set(start for start, _ in server.requests))
+    is_empty = lambda start: start - 2 >= nb_jobs  # overlap of 2 jobs
+    check(is_empty(starts[-1]) and not any(is_empty(start) for start in starts[:-1]),
+          f"stopped on the first empty page ({len(starts)} pages requested)")
+    server.shutdown()
+
+    server, search_url = start_search_server(list_job_IDs, page_size=page_size)
+    with contextlib.redirect_stdout(open(os.devnull, "w")):
+        found = scraping_Job_Ids_guest(
+            "data scientist", "Paris", search_url=search_url, max_jobs=20,
+            requests_per_second=0, job_ids_path=job_ids_path,
+        )
+    check(found == list_job_IDs[:20], "stopped at max_jobs")
+    server.shutdown()
+    shutil.rmtree(tmp_dir)
+
+
+def check_parity(nb_jobs=None, reference="auto"):
+    """The "light" skill engine finds the same skills as its reference pipeline
+    (see create_reference_nlp) in the scraped jobs (default: all of them)."""
+    from Spacy_text_analayzer import Spacy_create_nlp, get_skills_batch
+
+    texts = read_scraped_jobs()["Job_txt"].str.lower().to_list()
+    if nb_jobs is not None:
+        texts = texts[: int(nb_jobs)]
+    name, reference_nlp = create_reference_nlp(reference)
+    print(f"Skills of {len(texts)} jobs, light engine vs reference: {name}")
+    reference_skills = get_skills_batch(reference_nlp, texts)
+    light_skills = get_skills_batch(Spacy_create_nlp(engine="light"), texts)
+    different = [
+        (k, skills_ref, skills)
+        for k, (skills_ref, skills) in enumerate(zip(reference_skills, light_skills))
+        if skills_ref != skills
+    ]
+    for k, skills_ref, skills in different[:5]:
+        print(f"  job {k}: reference only {sorted(set(skills_ref) - set(skills))},"
+              f" light only {sorted(set(skills) - set(skills_ref))}")
+    check(len(different) == 0, f"{len(different)} jobs with different skills")
+
+
+#################################################################
+########        Main function
+#################################################################
+
+BENCHMARKS = {
+    "parsing": bench_parsing,
+    "engines": bench_engines,
+    "storage": bench_storage,
+    "scoring": bench_scoring,
+    "labeling": bench_labeling,
+    "render": bench_render,
+    "page_wait": bench_page_wait,
+    "pipeline": bench_pipeline,
+    "pdf": bench_pdf,
+    "screening": bench_screening,
+    "candidates": bench_candidates,
+    "dashboard": bench_dashboard,
+    "check_incremental": check_incremental,
+    "check_streaming": check_streaming,
+    "check_fetcher": check_fetcher,
+    "check_guest_search": check_guest_search,
+    "check_parity": check_parity,
+}
+
+
+def main():
+    if len(sys.argv) >= 2 and sys.argv[1] in BENCHMARKS:
+        BENCHMARKS[sys.argv[1]](*sys.argv[2:])
+    else:
+        print(
+            "Please provide the benchmark (or check) to run: "
+            + ", ".join(BENCHMARKS)
+            + "\nExample:\n"
+            "python benchmarks.py parsing ../data/html_fixtures"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,174 @@
+import os
+import json
+import hashlib
+import threading
+import traceback
+from collections import OrderedDict
+
+import warnings
+
+warnings.filterwarnings("ignore")
+
+_MISSING = object()
+_ON_DISK = object()  # DiskLRUCache: item saved on disk, not loaded in memory yet
+
+
+class LRUCache:
+    """Thread-safe dict keeping the `maxsize` most recently used items."""
+
+    def __init__(self, maxsize=128):
+        self.maxsize = maxsize
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.maxsize:
+                evicted_key, _ = self._items.popitem(last=False)  # least recently used
+                self._evict(evicted_key)
+
+    def _evict(self, key):
+        """Called (with the lock) when an item is evicted."""
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._items
+
+    def __len__(self):
+        with self._lock:
+            return len(self._items)
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+
+class DiskLRUCache(LRUCache):
+    """LRUCache whose items are also saved in `directory` (one json file per key),
+    so that they survive a restart. The keys must be valid file names (e.g. hashes).
+    The files saved before are indexed at startup (least recently written first) and
+    loaded when they are used; the file of an evicted item is deleted, so the directory
+    keeps at most `maxsize` files.
+    directory=None: memory only.
+    """
+
+    def __init__(self, maxsize=128, directory=None):
+        super().__init__(maxsize)
+        self.directory = directory
+        if directory is not None:
+            os.makedirs(directory, exist_ok=True)
+            self._index_files()
+
+    def _file_path(self, key):
+        return os.path.join(self.directory, f"{key}.json")
+
+    def _index_files(self):
+        list_files = []
+        for file_name in os.listdir(self.directory):
+            if not file_name.endswith(".json"):
+                continue
+            try:
+                mtime = os.path.getmtime(os.path.join(self.directory, file_name))
+            except OSError:
+                continue
+            list_files.append((mtime, file_name[: -len(".json")]))
+        for _, key in sorted(list_files):
+            super().put(key, _ON_DISK)  # evicts (deletes) the oldest files beyond maxsize
+
+    def _evict(self, key):
+        if self.directory is not None:
+            try:
+                os.remove(self._file_path(key))
+            except OSError:
+                pass
+
+    def get(self, key, default=None):
+        value = super().get(key, _MISSING)
+        if value is not _MISSING and value is not _ON_DISK:
+            return value
+        if self.directory is None:
+            return default
+        try:
+            with open(self._file_path(key)) as f:
+                value = json.load(f)
+        except (OSError, ValueError):  # not saved, or corrupted file
+            return default
+        super().put(key, value)
+        return value
+
+    def put(self, key, value):
+        super().put(key, value)
+        if self.directory is not None:
+            # write a temporary file first: a file is never left half written
+            tmp_path = self._file_path(key) + f".{os.getpid()}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, self._file_path(key))
+
+
+def get_bytes_hash(content):
+    """Hash (hex str) of the content of a file, used as a content-addressed cache key."""
+    return hashlib.sha256(content).hexdigest()[:32]
+
+
+class VersionedCache:
+    """Value built from versioned data (e.g. the dashboard figures of the scraped jobs).
+    get() returns the value built for the current version. When the version changes, the
+    value is rebuilt in a background thread and the previous value is served meanwhile;
+    only the first call waits for the value to be built.
+    Inputs:
+        - build (callable): returns the value (built from the current data).
+        - get_version (callable): returns the version of the data.
+    """
+
+    def __init__(self, build, get_version):
+        self._build = build
+        self._get_version = get_version
+        self._value = _MISSING
+        self._version = None  # version of the data when the value was built
+        self._building = None  # version being built in the background
+        self._lock = threading.Lock()
+        self._build_lock = threading.Lock()  # one build at a time
+
+    def get(self):
+        version = self._get_version()
+        with self._lock:
+            if self._value is not _MISSING:
+                if version != self._version and version != self._building:
+                    self._building = version
+                    threading.Thread(
+                        target=self._rebuild, args=(version,), daemon=True
+                    ).start()
+                return self._value
+        return self.refresh()
+
+    def refresh(self):
+        """Build the value now (e.g. right after the data changed) and return it."""
+        version = self._get_version()
+        with self._build_lock:
+            with self._lock:
+                if self._value is not _MISSING and self._version == version:
+                    return self._value  # built meanwhile by another thread
+            value = self._build()
+            with self._lock:
+                self._value, self._version = value, version
+            return value
+
+    def _rebuild(self, version):
+        try:
+            self.refresh()
+        except Exception:  # keep serving the previous value, retry on the next get()
+            traceback.print_exc()
+        finally:
+            with self._lock:
+                if self._building == version:
+                    self._building = None
@@ -0,0 +1,156 @@
+import itertools
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+
+import warnings
+
+warnings.filterwarnings("ignore")
+
+# Linkedin guest API (no login required) returning the html of a job posting.
+JOB_URL = "https://www.linkedin.com/jobs-guest/jobs/api/jobPosting/{}"
+
+# Linkedin guest API (no login required) returning a page of job search results.
+SEARCH_URL = "https://www.linkedin.com/jobs-guest/jobs/api/seeMoreJobPostings/search?keywords={}&location={}&start={}"
+
+# HTTP status codes worth retrying (rate limited or temporary server errors).
+RETRY_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+##########################################################################
+#     I- Connection pooling and per-host rate limiting
+##########################################################################
+
+
+def create_session(pool_size=10):
+    """Create a requests Session whose connection pool is shared by all the workers.
+    Inputs:
+        - pool_size (int): maximum number of connections kept alive per host.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+class HostRateLimiter:
+    """Space out the requests sent to the same host.
+    Each host gets at most `requests_per_second` requests per second,
+    whatever the number of workers (thread-safe).
+    """
+
+    def __init__(self, requests_per_second=5):
+        self.min_interval = 1.0 / requests_per_second if requests_per_second else 0
+        self._next_slot = {}  # host --> time of the next allowed request
+        self._lock = threading.Lock()
+
+    def wait(self, url):
+        """Block until a request to the host of `url` is allowed."""
+        if self.min_interval == 0:
+            return
+        host = urlparse(url).netloc
+        with self._lock:
+            now = time.monotonic()
+            slot = max(now, self._next_slot.get(host, now))
+            self._next_slot[host] = slot + self.min_interval
+        if slot > now:
+            time.sleep(slot - now)
+
+
+##########################################################################
+#     II- Fetch with retry and exponential backoff
+##########################################################################
+
+
+def get_retry_delay(resp, attempt, backoff_factor):
+    """Exponential backoff (backoff_factor * 2^attempt), or the server's Retry-After if longer."""
+    delay = backoff_factor * (2**attempt)
+    try:
+        delay = max(delay, float(resp.headers.get("Retry-After")))
+    except:
+        pass
+    return delay
+
+
+def fetch_url(
+    session, url, rate_limiter=None, max_retries=3, backoff_factor=1.0, timeout=30
+):
+    """GET `url`, retrying on connection errors and on RETRY_STATUS_CODES.
+    Returns the html (str) of the page, or None if all the attempts failed.
+    """
+    resp = None
+    for attempt in range(max_retries + 1):
+        if rate_limiter is not None:
+            rate_limiter.wait(url)
+        try:
+            resp = session.get(url, timeout=timeout)
+            if resp.status_code not in RETRY_STATUS_CODES:
+                return resp.text
+        except requests.RequestException:
+            resp = None
+
+        if attempt < max_retries:
+            time.sleep(get_retry_delay(resp, attempt, backoff_factor))
+
+    return None
+
+
+def fetch_job_postings(
+    list_job_IDs,
+    job_url=JOB_URL,
+    max_workers=8,
+    requests_per_second=5,
+    max_retries=3,
+    backoff_factor=1.0,
+    timeout=30,
+):
+    """Download the html of Linkedin job postings concurrently.
+    At most 2 * max_workers postings are downloaded ahead of the consumer, so the
+    memory used does not depend on the number of Job IDs.
+    Inputs:
+        - list_job_IDs (iterable): Job IDs to fetch (a list or an iterator).
+        - job_url (str): url template of a job posting (use a local server for testing).
+        - max_workers (int): number of concurrent requests.
+        - requests_per_second (float): max requests per second per host (0: no limit).
+        - max_retries, backoff_factor: retry policy (delay = backoff_factor * 2^attempt).
+        - timeout (seconds): timeout of each request.
+    Output:
+        - iterator of (Job_ID, html) tuples, in the order of list_job_IDs.
+          html is None if the posting could not be downloaded.
+    """
+    session = create_session(pool_size=max_workers)
+    rate_limiter = HostRateLimiter(requests_per_second)
+
+    def fetch(Job_ID):
+        html = fetch_url(
+            session,
+            job_url.format(Job_ID),
+            rate_limiter=rate_limiter,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            timeout=timeout,
+        )
+        return Job_ID, html
+
+    executor = ThreadPoolExecutor(max_workers=max_workers)
+    Job_IDs = iter(list_job_IDs)
+    pending = deque(
+        executor.submit(fetch, Job_ID)
+        for Job_ID in itertools.islice(Job_IDs, 2 * max_workers)
+    )
+    try:
+        while pending:
+            Job_ID, html = pending.popleft().result()
+            for next_Job_ID in itertools.islice(Job_IDs, 1):
+                pending.append(executor.submit(fetch, next_Job_ID))
+            yield Job_ID, html
+    finally:
+        # if the caller stops early (e.g. cancelled task), drop the pending downloads
+        executor.shutdown(wait=True, cancel_futures=True)
+        session.close()
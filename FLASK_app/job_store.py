@@ -0,0 +1,430 @@
+import os
+import glob
+import json
+import time
+import hashlib
+import shutil
+import threading
+
+import pandas as pd
+import warnings
+
+warnings.filterwarnings("ignore")
+
+JOBS_JSON_PATH = "../data/linkedin_jobs_scraped.json"
+JOBS_PARQUET_PATH = "../data/linkedin_jobs_scraped.parquet"  # directory of parquet files
+SEEN_JOBS_PATH = "../data/seen_jobs.json"  # index of the Job IDs already scraped
+STAGING_PATH = "../data/linkedin_jobs_staging.parquet"  # jobs of a scraping in progress
+
+# Storage of the scraped jobs: "json" (single json file) or "parquet" (columnar)
+STORAGE_BACKEND = "json"
+
+# Fixed types of the columns whose inferred type depends on the batch of jobs
+# (e.g. nb_candidats is int64 in a batch without missing values, float64 otherwise):
+# every parquet part is written with these types so that the parts can be read together.
+PARQUET_FLOAT_COLUMNS = ["nb_candidats"]
+PARQUET_DATE_COLUMNS = ["posted_date", "scraping_date"]
+
+
+##########################################################################
+#     I- Storage backends
+##########################################################################
+# A backend loads (optionally only some columns), saves and appends scraped jobs.
+# stamp() changes whenever the stored data changes.
+
+
+def empty_jobs_DF(columns=None):
+    """DF returned when no jobs are stored: the requested columns (default: Job_ID), no rows."""
+    return pd.DataFrame(columns=["Job_ID"] if columns is None else list(columns))
+
+
+class JsonBackend:
+    """Scraped jobs saved as one pandas json file (the whole file is parsed/rewritten)."""
+
+    def __init__(self, path=JOBS_JSON_PATH):
+        self.path = path
+
+    def stamp(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def load(self, columns=None):
+        try:
+            df = pd.read_json(self.path, convert_dates=["posted_date", "scraping_date"])
+        except (ValueError, OSError):  # missing or empty file
+            return empty_jobs_DF(columns)
+        if columns is not None:
+            df = df[[column for column in columns if column in df.columns]]
+        return df
+
+    def save(self, df):
+        # write a temporary file first: the jobs are never left half written
+        tmp_path = self.path + ".tmp"
+        df.to_json(tmp_path)
+        os.replace(tmp_path, self.path)
+
+    def append(self, df):
+        self.save(pd.concat([self.load(), df], ignore_index=True))
+
+
+class ParquetBackend:
+    """Scraped jobs saved in a directory of parquet files (columnar).
+    - load(columns) only reads the requested columns (e.g. without Job_txt).
+    - append(df) writes a new part file: the stored jobs are not rewritten.
+    """
+
+    def __init__(self, path=JOBS_PARQUET_PATH):
+        self.path = path
+
+    def part_paths(self):
+        return sorted(glob.glob(os.path.join(self.path, "part-*.parquet")))
+
+    def stamp(self):
+        stamp = []
+        for part_path in self.part_paths():
+            stat = os.stat(part_path)
+            stamp.append((part_path, stat.st_mtime_ns, stat.st_size))
+        return tuple(stamp) if stamp else None
+
+    def load(self, columns=None):
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        if not self.part_paths():
+            return empty_jobs_DF(columns)
+        # The parts are read one by one and their schemas unified: a column can be
+        # all null in a part (null type) and typed in another one, and the parts
+        # written before the types were fixed can have int64 instead of double.
+        tables = []
+        for part_path in self.part_paths():
+            part_columns = None
+            if columns is not None:
+                names = pq.read_schema(part_path).names
+                part_columns = [column for column in columns if column in names]
+            tables.append(pq.read_table(part_path, columns=part_columns))
+        table = pa.concat_tables(tables, promote_options="permissive")
+        df = table.to_pandas()
+        # parquet lists are read as numpy arrays --> convert them back to lists
+        for field in table.schema:
+            if str(field.type).startswith("list"):
+                df[field.name] = table.column(field.name).to_pylist()
+        return df
+
+    def save(self, df):
+        if os.path.isdir(self.path):
+            shutil.rmtree(self.path)
+        self.append(df)
+
+    def append(self, df):
+        os.makedirs(self.path, exist_ok=True)
+        part_paths = self.part_paths()
+        part_num = 0
+        if part_paths:
+            part_num = int(os.path.basename(part_paths[-1])[5:-8]) + 1
+        df = df.copy()
+        for column in PARQUET_FLOAT_COLUMNS:
+            if column in df.columns:
+                df[column] = pd.to_numeric(df[column], errors="coerce").astype("float64")
+        for column in PARQUET_DATE_COLUMNS:
+            if column in df.columns:
+                df[column] = pd.to_datetime(df[column], errors="coerce")
+        # write a temporary file first: a part is never left half written
+        part_path = os.path.join(self.path, f"part-{part_num:05d}.parquet")
+        df.to_parquet(part_path + ".tmp", index=False)
+        os.replace(part_path + ".tmp", part_path)
+
+    def replace_with(self, other):
+        """Replace the stored jobs by the parts of another ParquetBackend (moved, not copied)."""
+        old_path = self.path + ".old"
+        if os.path.isdir(old_path):
+            shutil.rmtree(old_path)
+        if os.path.isdir(self.path):
+            os.rename(self.path, old_path)
+        os.rename(other.path, self.path)
+        shutil.rmtree(old_path, ignore_errors=True)
+
+
+def create_backend(backend=STORAGE_BACKEND, path=None):
+    """Return the storage backend "json" or "parquet" (default path if path is None)."""
+    if backend == "parquet":
+        return ParquetBackend(path or JOBS_PARQUET_PATH)
+    return JsonBackend(path or JOBS_JSON_PATH)
+
+
+##########################################################################
+#     II- In-memory job store
+##########################################################################
+
+
+class JobStore:
+    """Process-wide store of the scraped Linkedin jobs.
+    The jobs are loaded once from the storage backend and kept in memory. They are
+    loaded again only when the stored data changes (backend stamp) or when the store
+    is invalidated. Each change increments `version`, which can be used to invalidate
+    derived data. Jobs can be looked up by Job_ID through a hash index.
+    """
+
+    def __init__(self, backend=None):
+        self.backend = backend if backend is not None else create_backend()
+        self.version = 0
+        self._stamp = None  # backend stamp when the jobs were loaded
+        self._loaded = False
+        self._dfs = {}  # columns (tuple, None: all) --> pandas DF
+        self._index = None  # Job_ID --> row position in self._dfs[None]
+        self._derived = {}  # name --> data derived from the jobs (see get_derived)
+        self._lock = threading.Lock()
+
+    def _check_stamp(self):
+        """Drop the loaded jobs if the stored data changed (call it with the lock)."""
+        stamp = self.backend.stamp()
+        if not self._loaded or stamp != self._stamp:
+            self._dfs = {}
+            self._index = None
+            self._derived = {}
+            self._stamp = stamp
+            self._loaded = True
+            self.version += 1
+
+    def _get(self, columns=None):
+        """Return the jobs DF (only `columns` if provided), reloaded if the data changed."""
+        return self._get_snapshot(columns)[1]
+
+    def _get_snapshot(self, columns=None):
+        """Return (version, jobs DF): the version of the data the DF was loaded from."""
+        with self._lock:
+            self._check_stamp()
+            if None in self._dfs and columns is not None:
+                df = self._dfs[None]
+                return self.version, df[[column for column in columns if column in df.columns]]
+
+            key = None if columns is None else tuple(columns)
+            if key not in self._dfs:
+                self._dfs[key] = self.backend.load(columns)
+            return self.version, self._dfs[key]
+
+    def _get_index(self):
+        df = self._get()
+        with self._lock:
+            index = self._index
+            if index is None:
+                index = {}
+                for position, Job_ID in enumerate(df["Job_ID"].to_list()):
+                    index.setdefault(int(Job_ID), position)  # keep the first occurrence
+                if self._dfs.get(None) is df:  # the jobs did not change meanwhile
+                    self._index = index
+            return df, index
+
+    def get_jobs_DF(self, columns=None):
+        """Return the pandas DF of the scraped jobs (shared: do not modify it in place).
+        Inputs:
+            - columns (list): load only these columns (default: all the columns).
+        """
+        return self._get(columns)
+
+    def get_job(self, Job_ID):
+        """Return the job (pandas Series) whose Job_ID is `Job_ID`, or None."""
+        df, index = self._get_index()
+        try:
+            position = index.get(int(Job_ID))
+        except (TypeError, ValueError):
+            position = None
+        if position is None:
+            return None
+        return df.iloc[position]
+
+    def get_derived(self, name, build):
+        """Return data derived from the jobs, built once per version with build(df).
+        The jobs DF and its version are returned with it (same snapshot of the jobs):
+        positions in the derived data are row positions in this DF.
+        Example: version, df, (skill_matrix, vocabulary) = get_derived(
+                     "skill_matrix", lambda df: build_skill_matrix(df["skills"]))
+        Output: (version, df, derived)
+        """
+        version, df = self._get_snapshot()
+        with self._lock:
+            if self._dfs.get(None) is df:  # the jobs did not change meanwhile
+                if name not in self._derived:
+                    self._derived[name] = build(df)
+                return version, df, self._derived[name]
+        return version, df, build(df)
+
+    def get_version(self):
+        with self._lock:
+            self._check_stamp()
+            return self.version
+
+    def save(self, df):
+        self.backend.save(df)
+        self.invalidate()
+
+    def append(self, df):
+        self.backend.append(df)
+        self.invalidate()
+
+    def merge(self, df):
+        """Add the jobs of df, replacing the stored jobs that have the same Job_ID."""
+        stored_df = self._get()
+        replaced = stored_df["Job_ID"].isin(df["Job_ID"])
+        if not replaced.any() and set(df.columns) == set(stored_df.columns):
+            self.backend.append(df)  # only new jobs: nothing to rewrite
+        else:
+            self.backend.save(pd.concat([stored_df[~replaced], df], ignore_index=True))
+        self.invalidate()
+
+    def commit_staging(self, staging, replace=True):
+        """Store the jobs written in a staging ParquetBackend, then delete it.
+        Inputs:
+            - staging (ParquetBackend): see open_staging.
+            - replace (bool): the staged jobs replace the stored jobs (False: they are merged).
+        """
+        if not replace:
+            self.merge(staging.load())
+        elif isinstance(self.backend, ParquetBackend):
+            with self._lock:  # the jobs are not read while the directories are renamed
+                self.backend.replace_with(staging)
+        else:
+            # json: the file is written once (all the staged jobs are loaded in memory)
+            self.backend.save(staging.load())
+        shutil.rmtree(staging.path, ignore_errors=True)
+        self.invalidate()
+
+    def invalidate(self):
+        """Force a reload on the next access (call it after writing the data)."""
+        with self._lock:
+            self._loaded = False
+
+
+# The store shared by the Flask app and the scraper
+job_store = JobStore()
+
+
+def get_jobs_DF(columns=None):
+    """Return the pandas DF of the scraped jobs, optionally only some columns (see JobStore)."""
+    return job_store.get_jobs_DF(columns)
+
+
+def get_job(Job_ID):
+    """Return the scraped job whose Job_ID is `Job_ID` (pandas Series), or None."""
+    return job_store.get_job(Job_ID)
+
+
+def get_derived(name, build):
+    """Return (version, jobs DF, data derived from the jobs), rebuilt when they change (see JobStore)."""
+    return job_store.get_derived(name, build)
+
+
+def get_data_version():
+    """Version stamp of the scraped jobs (incremented each time they change)."""
+    return job_store.get_version()
+
+
+def save_jobs_DF(df):
+    """Save the scraped jobs (replace the stored jobs) and invalidate the store."""
+    job_store.save(df)
+
+
+def append_jobs_DF(df):
+    """Append a batch of scraped jobs to the storage and invalidate the store."""
+    job_store.append(df)
+
+
+def merge_jobs_DF(df):
+    """Merge scraped jobs into the storage (jobs already stored are replaced)."""
+    job_store.merge(df)
+
+
+def open_staging(list_job_IDs, path=STAGING_PATH):
+    """Return the staging area (ParquetBackend) of a scraping and the Job IDs already staged.
+    The jobs are appended to it by chunks, and stored with commit_staged_jobs once the
+    scraping is over: the stored jobs are unchanged until then. The staging area left
+    by a scraping that stopped (crash, cancel) is kept, and resumed when the same jobs
+    are scraped again (all its Job IDs are in list_job_IDs); otherwise it is deleted.
+    Output: (staging, set of the Job IDs already staged (str))
+    """
+    staging = ParquetBackend(path)
+    try:
+        staged_IDs = set(staging.load(columns=["Job_ID"])["Job_ID"].astype(str))
+    except Exception:  # unreadable staging area
+        staged_IDs = None
+    if staged_IDs is None or not staged_IDs <= set(str(Job_ID) for Job_ID in list_job_IDs):
+        if os.path.isdir(path):
+            shutil.rmtree(path)  # left by another scraping
+        staged_IDs = set()
+    return staging, staged_IDs
+
+
+def commit_staged_jobs(staging, replace=True):
+    """Store the jobs of a staging area (replace or merge) and invalidate the store."""
+    job_store.commit_staging(staging, replace)
+
+
+def convert_storage(source="json", destination="parquet"):
+    """Copy the scraped jobs from one storage backend to another (e.g. json --> parquet)."""
+    create_backend(destination).save(create_backend(source).load())
+
+
+##########################################################################
+#     III- Index of the Job IDs already scraped
+##########################################################################
+
+
+def get_content_hash(text):
+    """Short hash of a job description (used to detect the postings that changed)."""
+    return hashlib.sha1(str(text).encode("utf-8")).hexdigest()[:16]
+
+
+class SeenJobsIndex:
+    """Persistent index of the Job IDs already scraped (json file):
+    Job_ID --> {"fetched_at": time of the last download (epoch seconds),
+                "content_hash": hash of the job description (see get_content_hash)}
+    Used by the incremental scraping to download only the new or stale postings.
+    """
+
+    def __init__(self, path=SEEN_JOBS_PATH):
+        self.path = path
+        try:
+            with open(path) as f:
+                self.jobs = json.load(f)
+        except (OSError, ValueError):  # missing or corrupted index: start again
+            self.jobs = {}
+
+    def __len__(self):
+        return len(self.jobs)
+
+    def is_stale(self, Job_ID, max_age):
+        """True if the job was never downloaded, or more than max_age seconds ago."""
+        entry = self.jobs.get(str(Job_ID))
+        return entry is None or time.time() - entry["fetched_at"] > max_age
+
+    def has_changed(self, Job_ID, content_hash):
+        """True if the job is new or if its description changed."""
+        entry = self.jobs.get(str(Job_ID))
+        return entry is None or entry["content_hash"] != content_hash
+
+    def update(self, Job_ID, content_hash, fetched_at=None):
+        self.jobs[str(Job_ID)] = {
+            "fetched_at": time.time() if fetched_at is None else fetched_at,
+            "content_hash": content_hash,
+        }
+
+    def add_jobs(self, jobs_DF):
+        """Index the jobs of a pandas DF (Job_ID, Job_txt, scraping_date)."""
+        if jobs_DF.empty or not {"Job_ID", "Job_txt", "scraping_date"} <= set(jobs_DF.columns):
+            return  # no jobs stored yet
+        for Job_ID, Job_txt, scraping_date in zip(
+            jobs_DF["Job_ID"], jobs_DF["Job_txt"], jobs_DF["scraping_date"]
+        ):
+            if pd.notnull(scraping_date):
+                self.update(
+                    Job_ID, get_content_hash(Job_txt), pd.Timestamp(scraping_date).timestamp()
+                )
+
+    def save(self):
+        # write a temporary file first: the index is never left half written
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(self.jobs, f)
+        os.replace(tmp_path, self.path)
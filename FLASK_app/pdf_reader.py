@@ -1,7 +1,9 @@
+import os
 from io import StringIO
+from concurrent.futures import ProcessPoolExecutor
 
 from pdfminer.converter import TextConverter
-from pdfminer.layout import LAParams
+from pdfminer.layout import LAParams, LTChar
 from pdfminer.pdfdocument import PDFDocument
 from pdfminer.pdfinterp import PDFResourceManager, PDFPageInterpreter
 from pdfminer.pdfpage import PDFPage
@@ -10,18 +12,121 @@ import warnings
 
 warnings.filterwarnings("ignore")
 
+RESUME_DIR = "../resume/"  # resume must be saved here.
 
-def pdf_miner(file_name):
-    file_path = "../resume/"  # resume must be saved here.
+# Extraction modes (see pdf_miner):
+#   - "layout": full pdfminer layout analysis (LAParams), the most faithful reading order.
+#   - "fast": no layout analysis, the characters are read in the order of the pdf
+#             content stream (spaces and line breaks are inferred from their positions).
+PDF_MODES = ["layout", "fast"]
+
+MAX_RESUME_SIZE = 10 * 1024 * 1024  # bytes: larger pdf files are rejected
+MAX_RESUME_PAGES = 30  # only the first pages of a resume are read
+PARALLEL_MIN_PAGES = 8  # pages are split between processes from this number of pages
+
+
+class FastTextConverter(TextConverter):
+    """TextConverter for pdfs processed without layout analysis (laparams=None).
+    The characters of a page are written in the order of the content stream:
+    a line break is added when the baseline changes, a space when there is a gap
+    between two characters (the text of a pdf often has no space characters).
+    """
+
+    def receive_layout(self, ltpage):
+        prev = None
+        for item in ltpage:
+            if not isinstance(item, LTChar):
+                continue
+            text = item.get_text()
+            if prev is not None:
+                height = max(prev.height, item.height, 1)
+                if abs(item.y0 - prev.y0) > 0.5 * height:
+                    self.write_text("\n")
+                elif item.x0 - prev.x1 > 0.15 * height and not text.isspace():
+                    self.write_text(" ")
+            self.write_text(text)
+            prev = item
+        self.write_text("\n\f")
+
+
+def extract_pages_text(file_path, pagenos=None, maxpages=0, mode="layout"):
+    """Return the text of the pages of a pdf file.
+    Inputs:
+        - pagenos (set): numbers of the pages to read (0-based, default: all the pages).
+        - maxpages (int): maximum number of pages to read (0: no limit).
+        - mode (str): "layout" or "fast" (see PDF_MODES).
+    """
     output_string = StringIO()
-    with open(file_path + file_name, "rb") as in_file:
-        parser = PDFParser(in_file)
-        doc = PDFDocument(parser)
-        rsrcmgr = PDFResourceManager()
+    rsrcmgr = PDFResourceManager()
+    if mode == "fast":
+        device = FastTextConverter(rsrcmgr, output_string, laparams=None)
+    else:
         device = TextConverter(rsrcmgr, output_string, laparams=LAParams())
-        interpreter = PDFPageInterpreter(rsrcmgr, device)
-        for page in PDFPage.create_pages(doc):
+    interpreter = PDFPageInterpreter(rsrcmgr, device)
+    with open(file_path, "rb") as in_file:
+        for page in PDFPage.get_pages(
+            in_file, pagenos=pagenos, maxpages=maxpages, check_extractable=False
+        ):
             interpreter.process_page(page)
+    device.close()
+    return output_string.getvalue()
+
+
+def get_number_of_pages(file_path):
+    """Number of pages of a pdf file (only the page tree is read)."""
+    with open(file_path, "rb") as in_file:
+        doc = PDFDocument(PDFParser(in_file))
+        return sum(1 for _ in PDFPage.create_pages(doc))
+
+
+def pdf_miner(
+    file_name,
+    mode="layout",
+    max_pages=MAX_RESUME_PAGES,
+    max_size=MAX_RESUME_SIZE,
+    n_process=1,
+    resume_dir=None,
+):
+    """Extract the text of a resume saved in ../resume/ (or in resume_dir).
+    Inputs:
+        - file_name (str): name of the pdf file.
+        - mode (str): "layout" (full layout analysis) or "fast" (see PDF_MODES).
+        - max_pages (int): only the first max_pages pages are read (0: all the pages).
+        - max_size (int): files larger than max_size bytes are rejected (ValueError).
+        - n_process (int): the pages of long resumes (PARALLEL_MIN_PAGES pages or more)
+                           are split between n_process processes.
+        - resume_dir (str): folder of the pdf file (default: RESUME_DIR).
+    Output: resume_txt (str)
+    """
+    file_path = os.path.join(resume_dir or RESUME_DIR, file_name)
+    file_size = os.path.getsize(file_path)
+    if max_size and file_size > max_size:
+        raise ValueError(
+            f"The resume file is too large ({file_size // 1024} KB, max: {max_size // 1024} KB)"
+        )
+
+    nb_pages = 0
+    if n_process > 1:
+        nb_pages = get_number_of_pages(file_path)
+        if max_pages:
+            nb_pages = min(nb_pages, max_pages)
+
+    if nb_pages < PARALLEL_MIN_PAGES:
+        return extract_pages_text(file_path, maxpages=max_pages, mode=mode)
 
-    resume_txt = output_string.getvalue()  # str type
+    # long resume: contiguous chunks of pages, read in parallel and joined in order
+    n_process = min(n_process, nb_pages)
+    chunks = [
+        set(range(k * nb_pages // n_process, (k + 1) * nb_pages // n_process))
+        for k in range(n_process)
+    ]
+    with ProcessPoolExecutor(max_workers=n_process) as executor:
+        list_texts = executor.map(
+            extract_pages_text,
+            [file_path] * n_process,
+            chunks,
+            [0] * n_process,
+            [mode] * n_process,
+        )
+        resume_txt = "".join(list_texts)  # str type
     return resume_txt
@@ -71,8 +71,14 @@ def return_plots_resume_analyzer(
     return graphs_analyzer
 
 
+# Columns of the scraped jobs used by the dashboard (Job_txt is not needed)
+DASHBOARD_COLUMNS = ["Job_ID", "level", "posted_date", "scraping_date", "skills"]
+
+
 def return_plots_dashboard(df):
-    """Return Plotly graph config (Dashboard page)."""
+    """Return Plotly graph config (Dashboard page).
+    df only needs the DASHBOARD_COLUMNS.
+    """
 
     try:
         # 1. Job Level and days since job posting
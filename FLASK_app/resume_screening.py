@@ -0,0 +1,365 @@
+import os
+import json
+import heapq
+import argparse
+import threading
+import multiprocessing
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import warnings
+
+warnings.filterwarnings("ignore")
+
+from job_store import get_derived
+from Spacy_text_analayzer import (
+    get_nlp,
+    build_skill_matrix,
+    get_top_k_matches,
+    get_resume_key,
+    extract_resume,
+    get_resume_analysis_cache,
+)
+
+SCREENING_RESULTS_PATH = "../data/screening_results.csv"
+CANDIDATES_PATH = "../data/candidates.json"  # pool of candidates: candidate ID --> skills
+SCREENING_COLUMNS = ["resume", "rank", "Job_ID", "match_score", "job-title", "company", "location"]
+
+
+##########################################################################
+#     I- Skills of the resumes, extracted in a process pool
+##########################################################################
+
+
+def list_resume_files(resumes_dir):
+    """Names of the pdf files of a folder (sorted)."""
+    return sorted(
+        file_name
+        for file_name in os.listdir(resumes_dir)
+        if file_name.lower().endswith(".pdf")
+        and os.path.isfile(os.path.join(resumes_dir, file_name))
+    )
+
+
+def init_worker():
+    get_nlp()  # load the Spacy nlp once per process
+
+
+def extract_resume_worker(file_name, resumes_dir):
+    """Return (text and skills of a resume, None), or (None, error message)."""
+    try:
+        return extract_resume(file_name, resume_dir=resumes_dir), None
+    except Exception as e:  # e.g. file too large, invalid pdf
+        return None, f"{type(e).__name__}: {e}"
+
+
+def analyze_resumes(list_file_names, resumes_dir, n_process=None, cache=None):
+    """Skills of many resumes.
+    The resumes already analyzed are read from the cache (see analyze_resume, cache=False:
+    no cache),
+    the other ones are extracted in a pool of n_process processes (default: number of CPUs).
+    Output:
+        - resume_skills (dict): file name --> list of skills
+        - errors (dict): file name --> error message (resumes that could not be read)
+    """
+    if cache is None:
+        cache = get_resume_analysis_cache()
+    elif cache is False:
+        cache = None
+    resume_skills, errors = {}, {}
+    keys = {}  # file name --> cache key of the resumes to extract
+    for file_name in list_file_names:
+        try:
+            key = get_resume_key(file_name, resumes_dir)
+        except OSError as e:
+            errors[file_name] = f"{type(e).__name__}: {e}"
+            continue
+        entry = cache.get(key) if cache is not None else None
+        if entry is None:
+            keys[file_name] = key
+        else:
+            resume_skills[file_name] = list(entry["skills"])
+
+    to_extract = list(keys)
+    n_process = min(n_process or os.cpu_count() or 1, len(to_extract))
+    if n_process <= 1:
+        results = [extract_resume_worker(file_name, resumes_dir) for file_name in to_extract]
+    else:
+        # spawn: safe to start from a multi-threaded process (e.g. the Flask app)
+        with ProcessPoolExecutor(
+            max_workers=n_process,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=init_worker,
+        ) as executor:
+            results = list(
+                executor.map(
+                    extract_resume_worker,
+                    to_extract,
+                    [resumes_dir] * len(to_extract),
+                    chunksize=max(1, len(to_extract) // (4 * n_process)),
+                )
+            )
+
+    for file_name, (entry, error) in zip(to_extract, results):
+        if entry is None:
+            errors[file_name] = error
+            continue
+        if cache is not None:
+            cache.put(keys[file_name], entry)
+        resume_skills[file_name] = entry["skills"]
+
+    # keep the order of the files
+    resume_skills = {
+        file_name: resume_skills[file_name]
+        for file_name in list_file_names
+        if file_name in resume_skills
+    }
+    return resume_skills, errors
+
+
+##########################################################################
+#     II- Screening: top matching jobs of every resume
+##########################################################################
+
+
+def screen_resumes(resumes_dir, k=10, n_process=None):
+    """Rank the scraped jobs for every resume (pdf) of a folder.
+    All the resumes are scored against all the jobs with matrix products
+    (see get_top_k_matches).
+    Inputs:
+        - resumes_dir (str): folder of the pdf resumes.
+        - k (int): number of top matching jobs per resume.
+        - n_process (int): number of processes extracting the skills of the resumes.
+    Output:
+        - results_DF (pandas DF): one row per (resume, top matching job), see SCREENING_COLUMNS.
+        - errors (dict): file name --> error message (resumes that could not be read)
+    """
+    resume_skills, errors = analyze_resumes(
+        list_resume_files(resumes_dir), resumes_dir, n_process=n_process
+    )
+
+    # the jobs DF and the skill matrix come from the same version of the jobs
+    _, df, (skill_matrix, vocabulary) = get_derived(
+        "skill_matrix", lambda df: build_skill_matrix(df["skills"])
+    )
+    top_matches = get_top_k_matches(
+        skill_matrix, vocabulary, list(resume_skills.values()), k
+    )
+
+    list_results = []
+    for file_name, (positions, scores) in zip(resume_skills, top_matches):
+        top_df = df.iloc[positions]
+        list_results.append(
+            pd.DataFrame(
+                {
+                    "resume": file_name,
+                    "rank": range(1, len(top_df) + 1),
+                    "Job_ID": top_df["Job_ID"].to_list(),
+                    "match_score": scores,
+                    "job-title": top_df["job-title"].to_list(),
+                    "company": top_df["company"].to_list(),
+                    "location": top_df["location"].to_list(),
+                }
+            )
+        )
+    results_DF = pd.DataFrame(columns=SCREENING_COLUMNS)
+    if list_results:
+        results_DF = pd.concat(list_results, ignore_index=True)
+    return results_DF, errors
+
+
+##########################################################################
+#     III- Candidate pool: best candidates of a job (reverse matching)
+##########################################################################
+
+
+class CandidateIndex:
+    """Pool of candidates (resumes) with an inverted index: skill --> candidate IDs.
+    The best candidates of a job are found by scoring only the candidates sharing at
+    least one skill with the job: the cost of a query is proportional to the postings
+    lists of the job skills, not to the size of the pool.
+    The pool is saved in a json file (candidate ID --> skills) and loaded again when
+    the file changes (e.g. candidates added with the command line): the candidates
+    added or removed since the last save() are applied again to the loaded pool.
+    """
+
+    def __init__(self, path=CANDIDATES_PATH):
+        self.path = path
+        self.candidates = {}  # candidate ID --> list of skills (unique, lowercase)
+        self._postings = {}  # skill --> set of candidate IDs
+        self._unsaved = {}  # candidate ID --> skills (None: removed), changes not saved yet
+        self._stamp = None
+        self._lock = threading.Lock()
+        self._load()
+
+    def _get_stamp(self):
+        try:
+            stat = os.stat(self.path)
+            return stat.st_mtime_ns, stat.st_size
+        except OSError:
+            return None
+
+    def _load(self):
+        self.candidates, self._postings = {}, {}
+        try:
+            with open(self.path) as f:
+                candidates = json.load(f)
+        except (OSError, ValueError):  # missing or corrupted file: empty pool
+            candidates = {}
+        for candidate_id, skills in candidates.items():
+            self._add(candidate_id, skills)
+        for candidate_id, skills in self._unsaved.items():  # keep the unsaved changes
+            if skills is None:
+                self._remove(candidate_id)
+            else:
+                self._add(candidate_id, skills)
+        self._stamp = self._get_stamp()
+
+    def _check_stamp(self):
+        """Load the pool again if the file changed (call it with the lock)."""
+        if self._get_stamp() != self._stamp:
+            self._load()
+
+    def _add(self, candidate_id, skills):
+        self._remove(candidate_id)
+        skills = sorted(set(str.lower(skill) for skill in skills))
+        self.candidates[candidate_id] = skills
+        for skill in skills:
+            self._postings.setdefault(skill, set()).add(candidate_id)
+
+    def _remove(self, candidate_id):
+        for skill in self.candidates.pop(candidate_id, []):
+            self._postings[skill].discard(candidate_id)
+            if not self._postings[skill]:
+                del self._postings[skill]
+
+    def __len__(self):
+        with self._lock:
+            self._check_stamp()
+            return len(self.candidates)
+
+    def add_candidate(self, candidate_id, skills):
+        """Add a candidate to the pool, or replace its skills (call save() to keep it)."""
+        with self._lock:
+            self._check_stamp()
+            self._add(str(candidate_id), skills)
+            self._unsaved[str(candidate_id)] = self.candidates[str(candidate_id)]
+
+    def remove_candidate(self, candidate_id):
+        with self._lock:
+            self._check_stamp()
+            self._remove(str(candidate_id))
+            self._unsaved[str(candidate_id)] = None
+
+    def add_resumes(self, resumes_dir, n_process=None):
+        """Add the resumes (pdf) of a folder to the pool (candidate ID: file name).
+        Return the resumes that could not be read (file name --> error message)."""
+        resume_skills, errors = analyze_resumes(
+            list_resume_files(resumes_dir), resumes_dir, n_process=n_process
+        )
+        for file_name, skills in resume_skills.items():
+            self.add_candidate(file_name, skills)
+        return errors
+
+    def match_job(self, job_skills, k=10):
+        """Best candidates of a job, by decreasing match score (ties: candidate ID).
+        Inputs:
+            - job_skills (list): skills required by the job (see get_match_score).
+            - k (int): number of candidates.
+        Output: list of (candidate ID, match score, number of matching skills)
+        """
+        nb_matching_skills = Counter()
+        with self._lock:
+            self._check_stamp()
+            for skill in job_skills:
+                nb_matching_skills.update(self._postings.get(str.lower(skill), ()))
+
+        top_candidates = heapq.nsmallest(
+            k, nb_matching_skills.items(), key=lambda item: (-item[1], item[0])
+        )
+        return [
+            (candidate_id, round(nb / len(job_skills) * 100, 1), nb)
+            for candidate_id, nb in top_candidates
+        ]
+
+    def save(self):
+        with self._lock:
+            self._check_stamp()  # keep the candidates saved meanwhile by another process
+            # write a temporary file first: the pool is never left half written
+            tmp_path = self.path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(self.candidates, f)
+            os.replace(tmp_path, self.path)
+            self._unsaved = {}
+            self._stamp = self._get_stamp()
+
+
+#################################################################
+########        Main function
+#################################################################
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Rank the scraped Linkedin jobs for every resume (pdf) of a folder.",
+        epilog="Example: python resume_screening.py ../resume --top-k 10\n"
+        "Candidate pool: python resume_screening.py ../resume --add-candidates\n"
+        "Best candidates of a job: python resume_screening.py --job-id 3762695166",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("resumes_dir", nargs="?", help="folder of the pdf resumes")
+    parser.add_argument(
+        "--top-k", type=int, default=10, help="number of top matching jobs per resume"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=None, help="number of processes (default: CPUs)"
+    )
+    parser.add_argument(
+        "--output", default=SCREENING_RESULTS_PATH, help="csv file of the results"
+    )
+    parser.add_argument(
+        "--add-candidates",
+        action="store_true",
+        help=f"add the resumes to the candidate pool ({CANDIDATES_PATH})",
+    )
+    parser.add_argument(
+        "--job-id", help="print the best candidates of the pool for this job"
+    )
+    args = parser.parse_args()
+
+    if args.job_id is not None:
+        from job_store import get_job
+
+        job = get_job(args.job_id)
+        if job is None:
+            parser.error(f"Job {args.job_id} was not found.")
+        job_skills = job["skills"] if isinstance(job["skills"], list) else []
+        for candidate_id, match_score, nb in CandidateIndex().match_job(
+            job_skills, k=args.top_k
+        ):
+            print(f"{match_score:5.1f} %  {candidate_id}  ({nb} skills)")
+        return
+    if args.resumes_dir is None:
+        parser.error("Please provide the folder of the resumes (or --job-id).")
+
+    if args.add_candidates:
+        candidate_index = CandidateIndex()
+        errors = candidate_index.add_resumes(args.resumes_dir, n_process=args.workers)
+        candidate_index.save()
+        print(f"{len(candidate_index)} candidates in the pool --> {CANDIDATES_PATH}")
+        for file_name, error in errors.items():
+            print(f"{file_name} could not be read: {error}")
+        return
+
+    results_DF, errors = screen_resumes(
+        args.resumes_dir, k=args.top_k, n_process=args.workers
+    )
+    results_DF.to_csv(args.output, index=False)
+    print(f"{results_DF['resume'].nunique()} resumes screened --> {args.output}")
+    for file_name, error in errors.items():
+        print(f"{file_name} could not be read: {error}")
+
+
+if __name__ == "__main__":
+    main()
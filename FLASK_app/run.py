@@ -1,19 +1,33 @@
-import pandas as pd
-import numpy as np
 from flask import Flask
-from flask import render_template, request, jsonify, flash
+from flask import render_template, request, jsonify, make_response, url_for
 import plotly
 import json
+import os
+import hashlib
 
-from plotly_figures import return_plots_dashboard, return_plots_resume_analyzer
+from plotly_figures import (
+    DASHBOARD_COLUMNS,
+    return_plots_dashboard,
+    return_plots_resume_analyzer,
+)
 from scraping_linkedin import scraping_main
-from pdf_reader import pdf_miner
+from job_store import get_jobs_DF, get_job, get_derived, get_data_version
+from cache_utils import LRUCache, VersionedCache
+from task_queue import TaskQueue
+from pdf_reader import RESUME_DIR
+from resume_screening import screen_resumes, CandidateIndex
 from Spacy_text_analayzer import (
-    Spacy_create_nlp,
+    get_nlp,
     get_skills,
     unique_skills,
-    update_LinkedinJobs_DF,
-    return_words_types,
+    build_skill_matrix,
+    get_match_scores,
+    get_resume_fingerprint,
+    analyze_resume,
+    rank_top_jobs,
+    get_skill_spans,
+    split_skill_spans,
+    get_text_segments,
     get_missing_skills,
     get_match_score,
 )
@@ -29,57 +43,123 @@ CHROME_DRIVER_PATH = "../chromedriver/chromedriver.exe"
 SLEEP_TIME = 120  # provide extra time for the webpage to load.
 LINKEDIN_job_URL = "https://www.linkedin.com/jobs/search/?currentJobId="
 
-# 1. create nlp with Spacy
-nlp = Spacy_create_nlp()
+# 1. create nlp with Spacy (shared with the scraper)
+nlp = get_nlp()
+
+# Scores of the analyzed resumes: resume fingerprint --> your skills and match scores.
+# The scraped jobs are read-only at request time.
+resume_scores_cache = LRUCache(maxsize=32)
+
+# Pool of candidates (see resume_screening.py), used to find the best candidates of a job.
+candidate_index = CandidateIndex()
+
+
+def get_resume_scores(resume_id, your_skills):
+    """Match score of every scraped job for a resume (cached per resume and data version).
+    Output: (jobs DF, match scores): the scores are in the order of the rows of the DF.
+    """
+    data_version, df, (skill_matrix, vocabulary) = get_derived(
+        "skill_matrix", lambda df: build_skill_matrix(df["skills"])
+    )
+    entry = resume_scores_cache.get(resume_id)
+    if entry is None or entry["data_version"] != data_version:
+        entry = {
+            "your_skills": your_skills,
+            "data_version": data_version,
+            "match_scores": get_match_scores(skill_matrix, vocabulary, your_skills),
+        }
+        resume_scores_cache.put(resume_id, entry)
+    return df, entry["match_scores"]
+
 
-df = pd.read_json(
-    "../data/linkedin_jobs_scraped.json",
-    convert_dates=["posted_date", "scraping_date"],
-)
 
-last_scraping_date = "None"
-try:
-    last_scraping_date = str(df.scraping_date.unique()[0])
-    last_scraping_date = last_scraping_date[:-8]
-except:
+def get_last_scraping_date(df):
     last_scraping_date = "None"
+    try:
+        last_scraping_date = str(df.scraping_date.unique()[0])
+        last_scraping_date = last_scraping_date[:-8]
+    except:
+        last_scraping_date = "None"
+    return last_scraping_date
 
-num_jobs = len(df)  # number of scraped Linkedin Jobs
 
 # 2. create plots with plotly
-graphs_dahboard = return_plots_dashboard(df)
+def build_dashboard():
+    """Dashboard plotly graphs, already encoded in JSON, and the scraping summary.
+    etag: hash of the content (the pages are not sent again if the browser has them)."""
+    df = get_jobs_DF(columns=DASHBOARD_COLUMNS)
+    graphs_dahboard = return_plots_dashboard(df)
+    dashboard = {
+        "ids": ["graph-{}".format(i) for i, _ in enumerate(graphs_dahboard)],
+        "graphJSON": json.dumps(graphs_dahboard, cls=plotly.utils.PlotlyJSONEncoder),
+        "scraping_date": get_last_scraping_date(df),
+        "num_jobs": len(df),  # number of scraped Linkedin Jobs
+    }
+    content = json.dumps(dashboard, sort_keys=True).encode("utf-8")
+    dashboard["etag"] = hashlib.sha1(content).hexdigest()[:16]
+    return dashboard
+
+
+# Built once per version of the scraped jobs (rebuilt in the background when they change)
+dashboard_cache = VersionedCache(build_dashboard, get_data_version)
+dashboard_cache.refresh()
+
+
+def render_cached_page(template, etag, **kwargs):
+    """Render a page built from the dashboard cache, or return 304 (Not Modified)
+    if the browser already has this version of the page (If-None-Match)."""
+    if request.if_none_match.contains(etag):
+        response = make_response("", 304)
+    else:
+        response = make_response(render_template(template, **kwargs))
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"  # the browser checks the ETag
+    return response
 
 
 # 3. Scraping page
 @app.route("/")
 @app.route("/scraping")
 def scraping_flask():
-    # Encode plotly graphs in JSON
-    ids = ["graph-{}".format(i) for i, _ in enumerate(graphs_dahboard)]
-    graphJSON = json.dumps(graphs_dahboard, cls=plotly.utils.PlotlyJSONEncoder)
+    dashboard = dashboard_cache.get()
 
     # Render web page with plotly graphs
-    return render_template(
+    return render_cached_page(
         "scraping.html",
-        ids=ids,
-        graphJSON=graphJSON,
-        scraping_date=last_scraping_date,
-        num_jobs=num_jobs,
+        "scraping-" + dashboard["etag"],
+        ids=dashboard["ids"],
+        graphJSON=dashboard["graphJSON"],
+        scraping_date=dashboard["scraping_date"],
+        num_jobs=dashboard["num_jobs"],
     )
 
 
 # 4. Dashboard page
 @app.route("/dashboard")
 def dashboard():
-    # Encode plotly graphs in JSON
-    ids = ["graph-{}".format(i) for i, _ in enumerate(graphs_dahboard)]
-    graphJSON = json.dumps(graphs_dahboard, cls=plotly.utils.PlotlyJSONEncoder)
+    dashboard = dashboard_cache.get()
 
     # Render web page with plotly graphs
-    return render_template("dashboard.html", ids=ids, graphJSON=graphJSON)
+    return render_cached_page(
+        "dashboard.html",
+        "dashboard-" + dashboard["etag"],
+        ids=dashboard["ids"],
+        graphJSON=dashboard["graphJSON"],
+    )
 
 
 # 5. Web page to display scraping results
+# The scraping runs in the background (it can take more than an hour): the page
+# polls the status of the task. One scraping at a time (they write the same files).
+scraping_tasks = TaskQueue(nb_workers=1)
+
+
+def scraping_and_refresh(*args, **kwargs):
+    """Scrape Linkedin jobs, then rebuild the dashboard with the new jobs."""
+    scraping_main(*args, **kwargs)
+    dashboard_cache.refresh()
+
+
 @app.route("/go_scraping")
 def go():
     # Save user input in query
@@ -87,47 +167,53 @@ def go():
     query_location = request.args.get("query_location", "")
 
     message = ""
+    task_id = None
 
     # Show error message if query_keywords or query_location is empty:
     if (query_keywords.strip() == "") | (query_location.strip() == ""):
         message = "Please enter keywords and location."
-        return render_template("go_scraping.html", num_jobs=0, message=message, ids=[])
-
-    try:
-        # 5.1. Linkedin Scraping
-        scraping_main(
+    else:
+        # 5.1. Linkedin Scraping (background task)
+        task_id = scraping_tasks.submit(
+            scraping_and_refresh,
             query_keywords,
             query_location,
+            name=f"{query_keywords} | {query_location}",
             chrome_driver_path=CHROME_DRIVER_PATH,
             sleep_time=SLEEP_TIME,
         )
 
-        # 5.2. read json file containing scraping results (Linkedin jobs)
-        df = pd.read_json(
-            "../data/linkedin_jobs_scraped.json",
-            convert_dates=["posted_date", "scraping_date"],
-        )
-
-        num_jobs = len(df)
-        graphs_dahboard = return_plots_dashboard(df)
-
-        # 5.3 Encode plotly graphs in JSON
-        ids = ["graph-{}".format(i) for i, _ in enumerate(graphs_dahboard)]
-        graphJSON = json.dumps(graphs_dahboard, cls=plotly.utils.PlotlyJSONEncoder)
-    except:
-        pass
-
     # This will render the go_scraping.html file.
     return render_template(
         "go_scraping.html",
-        num_jobs=num_jobs,
-        ids=ids,
-        graphJSON=graphJSON,
+        num_jobs=0,
+        ids=[],
+        graphJSON="[]",
         message=message,
+        task_id=task_id,
         scraping_date="None",
     )
 
 
+# 5.2. Status of a scraping task: status, progress counters, error
+@app.route("/scraping_status/<task_id>")
+def scraping_status(task_id):
+    task = scraping_tasks.get(task_id)
+    if task is None:
+        return jsonify({"task_id": task_id, "error": "unknown task"}), 404
+    return jsonify(task.to_dict())
+
+
+# 5.3. Cancel a scraping task
+@app.route("/scraping_cancel/<task_id>", methods=["POST"])
+def scraping_cancel(task_id):
+    task = scraping_tasks.get(task_id)
+    if task is None:
+        return jsonify({"task_id": task_id, "error": "unknown task"}), 404
+    cancelled = scraping_tasks.cancel(task_id)
+    return jsonify(dict(task.to_dict(), cancelled=cancelled))
+
+
 # 6. Resume analyzer page
 @app.route("/resume_analyzer")
 def resume_analyzer_flask():
@@ -139,16 +225,26 @@ def resume_analyzer_flask():
 def go_analyzer_flask():
     # 7.1. Save user input in query
     query_resume_path = request.args.get("query_resume_path", "")
+    cursor = request.args.get("cursor")  # page of the top matching jobs
+    next_cursor = None
+    resume_id = ""
+
+    # 7.2. PDF reader: get your skills (cached by the content of the pdf)
+    message = "Please select a resume file (.pdf)"
+    if query_resume_path != "":
+        try:
+            resume_txt, list_your_skills = analyze_resume(query_resume_path, nlp)
+            message = ""
+        except ValueError as e:  # e.g. pdf file too large
+            message = str(e)
 
-    # 7.2. PDF reader
-    if query_resume_path == "":
+    if message != "":
         resume_txt = ""
         list_your_skills = []
         list_required_skills = []
         num_skills = -1
         ids = []
         graphJSON = []
-        message = "Please select a resume file (.pdf)"
 
         #####################################
         # top matching jobs
@@ -168,19 +264,13 @@ def go_analyzer_flask():
         list_match_score = []
         list_missing_skills = []
     else:
-        message = ""
-        resume_txt = pdf_miner(query_resume_path)
-
-        # 7.3. Get your skills
-        list_your_skills = get_skills(nlp, resume_txt)
-        list_your_skills = list(set(list_your_skills))  # remove dupplications
+        # 7.3. Number of your skills
         num_skills = len(list_your_skills)  # number of skills
 
-        # 7.4. read json file containing scraping results (Linkedin jobs)
-        df = pd.read_json(
-            "../data/linkedin_jobs_scraped.json",
-            convert_dates=["posted_date", "scraping_date"],
-        )
+        # 7.4. get the scraping results (Linkedin jobs) and the match scores of your
+        # resume, from the same version of the jobs (scores cached per resume)
+        resume_id = get_resume_fingerprint(list_your_skills)
+        df, match_scores = get_resume_scores(resume_id, list_your_skills)
         list_required_skills = []
         for skills in df.skills.values:
             for skill in skills:
@@ -193,29 +283,34 @@ def go_analyzer_flask():
         ids = ["graph-{}".format(i) for i, _ in enumerate(graphs_analyzer)]
         graphJSON = json.dumps(graphs_analyzer, cls=plotly.utils.PlotlyJSONEncoder)
 
-        # 7.6. Update update_LinkedinJobs_DF with your skills
-        # pricisely: add columns missing_skills and match_score
-        df = update_LinkedinJobs_DF(df, your_skills=list_your_skills)
-
-        # 7.7. Create lists containg top matching Jobs
-        nb_top_matching = min(
+        # 7.6. Create lists containg top matching Jobs (partial ranking, one page)
+        top_df, next_cursor = rank_top_jobs(
+            df,
+            match_scores,
             NB_TOP_MATCHING_JOBS_TO_DISPLAY,
-            len(df.head(NB_TOP_MATCHING_JOBS_TO_DISPLAY)),
+            cursor,
+            score_column="match_score",
         )
-
-        list_Job_ID = df.head(nb_top_matching)["Job_ID"].to_list()
-        list_Job_txt = df.head(nb_top_matching)["Job_txt"].to_list()
-        list_company = df.head(nb_top_matching)["company"].to_list()
-        list_job_title = df.head(nb_top_matching)["job-title"].to_list()
-        list_level = df.head(nb_top_matching)["level"].to_list()
-        list_location = df.head(nb_top_matching)["location"].to_list()
-        list_posted_time_ago = df.head(nb_top_matching)["posted-time-ago"].to_list()
-        list_nb_candidats = df.head(nb_top_matching)["nb_candidats"].to_list()
-        # list_scraping_date = df.head(nb_top_matching)["scraping_date"].to_list()
-        list_posted_date = df.head(nb_top_matching)["posted_date"].to_list()
-        list_skills = df.head(nb_top_matching)["skills"].to_list()
-        list_match_score = df.head(nb_top_matching)["match_score"].to_list()
-        list_missing_skills = df.head(nb_top_matching)["missing_skills"].to_list()
+        your_skills = ",".join(list_your_skills)
+        top_df["missing_skills"] = [
+            get_missing_skills(skills, your_skills, return_list=False)
+            for skills in top_df["skills"]
+        ]
+        nb_top_matching = len(top_df)
+
+        list_Job_ID = top_df["Job_ID"].to_list()
+        list_Job_txt = top_df["Job_txt"].to_list()
+        list_company = top_df["company"].to_list()
+        list_job_title = top_df["job-title"].to_list()
+        list_level = top_df["level"].to_list()
+        list_location = top_df["location"].to_list()
+        list_posted_time_ago = top_df["posted-time-ago"].to_list()
+        list_nb_candidats = top_df["nb_candidats"].to_list()
+        # list_scraping_date = top_df["scraping_date"].to_list()
+        list_posted_date = top_df["posted_date"].to_list()
+        list_skills = top_df["skills"].to_list()
+        list_match_score = top_df["match_score"].to_list()
+        list_missing_skills = top_df["missing_skills"].to_list()
 
     # Render web page with plotly graphs
     return render_template(
@@ -242,51 +337,64 @@ def go_analyzer_flask():
         list_skills=list_skills,
         list_match_score=list_match_score,
         list_missing_skills=list_missing_skills,
+        # pagination
+        query_resume_path=query_resume_path,
+        next_cursor=next_cursor,
+        resume_id=resume_id,
     )
 
 
 # 8. `display_job` page
 @app.route("/display_Job")
 def display_Job():
-    # Get job_id from request.args
+    # Get job_id and resume_id (fingerprint of the analyzed resume) from request.args
     job_id = request.args.get("job_id", "")
-
-    df = pd.read_json(
-        "../data/linkedin_jobs_scraped.json",
-        convert_dates=["posted_date", "scraping_date"],
-    )
-
-    df = df[df.Job_ID == int(job_id)].copy()
-
-    Job_ID = df["Job_ID"].values[0]
-    Job_txt = df["Job_txt"].values[0]
-    company = df["company"].values[0]
-    job_title = df["job-title"].values[0]
-    level = df["level"].values[0]
-    location = df["location"].values[0]
-    posted_time_ago = df["posted-time-ago"].values[0]
-    nb_candidats = df["nb_candidats"].values[0]
-    scraping_date = df["scraping_date"].values[0]
-    posted_date = df["posted_date"].values[0]
-    skills = df["skills"].values[0]
-    match_score = df["match_score"].values[0]
-    missing_skills = df["missing_skills"].values[0]  # str
-    try:
-        missing_skills = missing_skills.split(",")  # convert to list
-    except:
-        pass
-
-    # return word_type (Skills OK, Skills NOK, other words)
-    words, types = [], []
+    resume_id = request.args.get("resume_id", "")
+
+    # Look up the job by Job_ID (hash index of the job store)
+    job = get_job(job_id)
+    if job is None:
+        return "Job not found", 404
+
+    Job_ID = job["Job_ID"]
+    Job_txt = job["Job_txt"]
+    company = job["company"]
+    job_title = job["job-title"]
+    level = job["level"]
+    location = job["location"]
+    posted_time_ago = job["posted-time-ago"]
+    nb_candidats = job["nb_candidats"]
+    scraping_date = job["scraping_date"]
+    posted_date = job["posted_date"]
+    skills = job["skills"]
+
+    # Match score and missing skills of the analyzed resume (unknown or evicted
+    # resume_id: the skills are displayed without matching, see display_Job.html)
+    match_score = None
+    missing_skills = []
+    entry = resume_scores_cache.get(resume_id)
+    if entry is not None:
+        your_skills = ",".join(entry["your_skills"])
+        match_score = get_match_score(skills, your_skills)
+        missing_skills = get_missing_skills(skills, your_skills)
+
+    # Text segments (text, type): Skills OK, Skills NOK, other words
+    segments = []
+    skill_spans = job.get("skill_spans")
     try:
-        words, types = return_words_types(
-            Job_txt,
-            list_required_skills=skills,
-            list_missing_skills=missing_skills,
-            spacy_nlp=nlp,
-        )
+        if isinstance(skill_spans, list):
+            # skill offsets stored at scraping time: no NLP, only the per-resume split
+            spans = split_skill_spans(skill_spans, missing_skills)
+        else:  # jobs scraped before the skill offsets were stored
+            spans = get_skill_spans(
+                Job_txt,
+                list_required_skills=skills,
+                list_missing_skills=missing_skills,
+                spacy_nlp=nlp,
+            )
+        segments = get_text_segments(Job_txt, spans)
     except:
-        words, types = [], []
+        segments = []
 
     # render html page.
     return render_template(
@@ -304,9 +412,8 @@ def display_Job():
         skills=skills,
         match_score=match_score,
         missing_skills=missing_skills,
-        words=words,
-        types=types,
-        nb_words=len(words),
+        resume_analyzed=entry is not None,
+        segments=segments,
         job_url=LINKEDIN_job_URL + job_id,
     )
 
@@ -324,24 +431,26 @@ def go_resume_vs_Job_flask():
     query_resume_path = request.args.get("query_resume_path", "")
     query_job_descreption = request.args.get("query_job_descreption", "")
 
-    # 2. PDF reader
-    if (query_resume_path == "") | (query_job_descreption == ""):
+    # 2. PDF reader: get your skills (cached by the content of the pdf)
+    message = "Please select a resume file (.pdf) and add a job descreption."
+    if (query_resume_path != "") & (query_job_descreption != ""):
+        try:
+            resume_txt, list_your_skills = analyze_resume(query_resume_path, nlp)
+            message = ""
+        except ValueError as e:  # e.g. pdf file too large
+            message = str(e)
+
+    if message != "":
         resume_txt = ""
         num_skills = -1
         match_score = -1
         missing_skills = ""
         list_your_skills = []
         list_required_skills = []
-        message = "Please select a resume file (.pdf) and add a job descreption."
-        words, types = [], []
+        segments = []
 
     else:
-        message = ""
-        resume_txt = pdf_miner(query_resume_path)
-
-        # 3. Get your skills
-        list_your_skills = get_skills(nlp, resume_txt)
-        list_your_skills = list(set(list_your_skills))  # remove dupplications
+        # 3. Number of your skills
         num_skills = len(list_your_skills)  # number of skills
 
         # 4. Get required skills
@@ -352,17 +461,18 @@ def go_resume_vs_Job_flask():
         match_score = get_match_score(list_required_skills, your_skills)
         missing_skills = get_missing_skills(list_required_skills, your_skills)
 
-        # return word_indexes (Skills OK, Skills NOK, other words)
-        words, types = [], []
+        # Text segments (text, type): Skills OK, Skills NOK, other words
+        segments = []
         try:
-            words, types = return_words_types(
+            spans = get_skill_spans(
                 query_job_descreption,
                 list_required_skills=list_required_skills,
                 list_missing_skills=missing_skills,
                 spacy_nlp=nlp,
             )
+            segments = get_text_segments(query_job_descreption, spans)
         except:
-            words, types = [], []
+            segments = []
 
     # Render web page with plotly graphs
     return render_template(
@@ -373,9 +483,89 @@ def go_resume_vs_Job_flask():
         list_your_skills=list_your_skills,
         list_required_skills=list_required_skills,
         message=message,
-        words=words,
-        types=types,
-        nb_words=len(words),
+        segments=segments,
+    )
+
+
+# 12. Bulk screening: top matching jobs of every resume of a folder (json)
+# The screening runs in the background (the resumes are analyzed in a process pool):
+# /screen_resumes returns a task id, /screening_status returns the results when done.
+screening_tasks = TaskQueue(nb_workers=1)
+SCREENING_PROCESSES = 2  # processes extracting the resumes of a web request
+
+
+def screen_resumes_task(resumes_dir, k, progress=None):
+    """Screen the resumes of a folder; return the results grouped by resume (json)."""
+    progress(resumes_screened=0)
+    results_DF, errors = screen_resumes(resumes_dir, k=k, n_process=SCREENING_PROCESSES)
+    results = {
+        resume: resume_DF.drop(columns="resume").to_dict(orient="records")
+        for resume, resume_DF in results_DF.groupby("resume", sort=False)
+    }
+    progress(resumes_screened=len(results), errors=len(errors))
+    return {"results": results, "errors": errors}
+
+
+@app.route("/screen_resumes")
+def screen_resumes_flask():
+    # folder of pdf resumes, relative to ../resume/ (default: ../resume/ itself)
+    resumes_dir = request.args.get("resumes_dir", "")
+    try:
+        k = max(int(request.args.get("k", 10)), 1)
+    except ValueError:
+        k = 10
+
+    root_dir = os.path.realpath(RESUME_DIR)
+    path = os.path.realpath(os.path.join(root_dir, resumes_dir))
+    if os.path.commonpath([root_dir, path]) != root_dir or not os.path.isdir(path):
+        return jsonify({"error": "resumes_dir must be a folder of ../resume/"}), 400
+
+    task_id = screening_tasks.submit(screen_resumes_task, path, k, name=resumes_dir)
+    return (
+        jsonify(
+            {
+                "task_id": task_id,
+                "status_url": url_for("screening_status", task_id=task_id),
+            }
+        ),
+        202,
+    )
+
+
+# 12.1. Status of a screening task (with the results when it is done)
+@app.route("/screening_status/<task_id>")
+def screening_status(task_id):
+    task = screening_tasks.get(task_id)
+    if task is None:
+        return jsonify({"task_id": task_id, "error": "unknown task"}), 404
+    status = task.to_dict()
+    if task.status == "done":
+        status.update(task.result)
+    return jsonify(status)
+
+
+# 13. Reverse matching: best candidates of the pool for a job (json)
+@app.route("/job_candidates")
+def job_candidates_flask():
+    job = get_job(request.args.get("job_id", ""))
+    if job is None:
+        return jsonify({"error": "job not found"}), 404
+    try:
+        k = max(int(request.args.get("k", 10)), 1)
+    except ValueError:
+        k = 10
+
+    job_skills = job["skills"] if isinstance(job["skills"], list) else []
+    candidates = [
+        {"candidate_id": candidate_id, "match_score": match_score, "nb_matching_skills": nb}
+        for candidate_id, match_score, nb in candidate_index.match_job(job_skills, k)
+    ]
+    return jsonify(
+        {
+            "Job_ID": int(job["Job_ID"]),
+            "nb_candidates": len(candidate_index),
+            "candidates": candidates,
+        }
     )
 
 
@@ -3,22 +3,30 @@ from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
 from bs4 import BeautifulSoup
 from selenium.webdriver.chrome.service import Service
+from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException
 import requests
 
 import time, datetime
+import queue
+from concurrent.futures import ThreadPoolExecutor
 import pandas as pd
 import numpy as np
-import math, re, sys
+import math, re
+import itertools
+import argparse
 import warnings
 
 warnings.filterwarnings("ignore")
 
+from task_queue import TaskCancelled
+
 # Import functions to create column: skills (required skills)
 from Spacy_text_analayzer import (
-    Spacy_create_nlp,
-    get_skills,
+    get_nlp,
+    get_skills_batch,
     unique_skills,
-    update_LinkedinJobs_DF,
 )
 
 
@@ -36,22 +44,73 @@ def get_user_credentials():
     return email_address, password
 
 
+# Each page of the search results lists up to 25 jobs (lazily loaded while scrolling)
+JOBS_PER_PAGE = 25
+JOB_ITEM_CLASS = "jobs-search-results__list-item"
+
+
+def count_job_items(driver):
+    """Number of jobs currently listed on the page."""
+    return len(driver.find_elements(By.CLASS_NAME, JOB_ITEM_CLASS))
+
+
+def wait_for_jobs(
+    driver, timeout=120, poll_interval=0.5, stable_time=3, expected=JOBS_PER_PAGE
+):
+    """Scroll down and wait until the jobs of the page are loaded, i.e. until:
+    - `expected` jobs are listed (full page), or
+    - the number of jobs did not change during `stable_time` seconds (last page), or
+    - `timeout` seconds.
+    The page is polled every `poll_interval` seconds (no fixed sleep).
+    Output:
+        - dict of timing metrics: elapsed (seconds), nb_jobs, nb_polls and
+          reason ("complete", "stable" or "timeout").
+    """
+    start = time.monotonic()
+    last_count, last_change = -1, start
+    nb_polls = 0
+    while True:
+        # scroll to the bottom of the page and to the last job: it loads the next jobs
+        driver.execute_script(
+            "window.scrollTo(0, document.body.scrollHeight);"
+            "var jobs = document.getElementsByClassName(arguments[0]);"
+            "if (jobs.length > 0) {jobs[jobs.length - 1].scrollIntoView();}",
+            JOB_ITEM_CLASS,
+        )
+        count = count_job_items(driver)
+        nb_polls += 1
+        now = time.monotonic()
+        if count != last_count:
+            last_count, last_change = count, now
+
+        if count >= expected:
+            reason = "complete"
+        elif count > 0 and now - last_change >= stable_time:
+            reason = "stable"
+        elif now - start >= timeout:
+            reason = "timeout"
+        else:
+            time.sleep(poll_interval)
+            continue
+        break
+
+    return {
+        "elapsed": round(time.monotonic() - start, 2),
+        "nb_jobs": count,
+        "nb_polls": nb_polls,
+        "reason": reason,
+    }
+
+
 def scroll_to_bottom(driver, sleep_time=120):
     """scrolling down to the bottom of the page to load all jobs
     Inputs:
-        - sleep_time (seconds): provide extra time for the webpage to load (default= 120 seconds).
-                            If the 25 jobs are not loaded within this timer,
-                            we can adjust the time and test again.
+        - sleep_time (seconds): maximum time to wait for the webpage to load (default= 120 seconds).
+                            We stop waiting as soon as the 25 jobs are loaded (see wait_for_jobs).
+    Output:
+        - timing metrics of the page (see wait_for_jobs).
     """
-    last_height = driver.execute_script("return document.body.scrollHeight")
-    while True:
-        driver.execute_script("window.scrollTo(0, document.body.scrollHeight);")
-        new_height = driver.execute_script("return document.body.scrollHeight")
-        if new_height == last_height:
-            break
-        last_height = new_height
-
-    time.sleep(sleep_time)
+    return wait_for_jobs(driver, timeout=float(sleep_time))
 
 
 def find_Job_Ids(soup):
@@ -67,69 +126,44 @@ def find_Job_Ids(soup):
 
     return Job_Ids_on_the_page
 
-def scraping_Job_Ids(
-    keywords,
-    location,
-    email_address,
-    password,
-    chromedriver_path="../chromedriver/chromedriver.exe",
-    sleep_time=120,
-):
-    """Scrape linkedin Job Ids using selenium and BeautifulSoup
-    Inputs:
-    - keywords (str): the Job title
-    - location (str)
-    - email_address and password: user credentials
-    - chromedriver_path (str): path of the chromedriver
-    - sleep_time (seconds): provide extra time for the webpage to load (default= 120 seconds).
-                            If the 25 jobs are not loaded within this timer,
-                            we can adjust the time and test again.
-    """
+SEARCH_URL = "https://www.linkedin.com/jobs/search/?keywords={}&location={}&start={}"
+MAX_PAGE_RETRIES = 2  # a results page that fails is put back in the queue this many times
 
-    # 1. Instanciate the chrome service
-    service = Service(executable_path=chromedriver_path)
 
-    # 2. Instanciate the webdriver
+def create_driver(chromedriver_path="../chromedriver/chromedriver.exe", headless=False):
+    """Instanciate a chrome webdriver (headless: without opening a browser window)."""
+    service = Service(executable_path=chromedriver_path)
     options = webdriver.ChromeOptions()
     options.add_argument("--start-maximized")
-    driver = webdriver.Chrome(options=options, service=service)
+    if headless:
+        options.add_argument("--headless=new")
+        options.add_argument("--window-size=1920,1080")
+    return webdriver.Chrome(options=options, service=service)
 
-    # 3. Open the LinkedIn login page
+
+def linkedin_login(driver, email_address, password, timeout=120):
+    """Sign in to Linkedin (waits for the login form, then for the next page)."""
+    # 1. Open the LinkedIn login page (wait for the login form)
     driver.get("https://www.linkedin.com/login")
-    time.sleep(5)  # waiting for the page to load
+    wait = WebDriverWait(driver, float(timeout))
+    email_input = wait.until(EC.presence_of_element_located((By.ID, "username")))
 
-    # 4. Enter our email@ & pwd
-    email_input = driver.find_element(By.ID, "username")
+    # 2. Enter our email@ & pwd
     password_input = driver.find_element(By.ID, "password")
     email_input.send_keys(email_address)
     password_input.send_keys(password)
 
-    # 5. Click the login button
+    # 3. Click the login button (wait until we leave the login page)
+    login_page_url = driver.current_url
     password_input.send_keys(Keys.ENTER)
+    try:
+        wait.until(EC.url_changes(login_page_url))
+    except TimeoutException:
+        print("Login: still on the login page, continue anyway.")
 
-    time.sleep(10)
-
-    # 6. Scraping Linkedin Jobs IDs
-    ##############################################################################
-    # Set the search query parameters: Job title and location.
-    # Search results are displayed on many pages: `25` jobs are listed on each page.
-    # We will navigate to every page using the `start` parameter (0,25,50...)
-    # We need to scroll to the bottom of the page to load the full data.
-    # To get Job Ids, we will parse the HTML content of the page using BeautifulSoup.
-
-    List_Job_IDs = []
-
-    # 6.1 Navigate to the first page (start=0) and scroll to the bottom of the page
-    url = f"https://www.linkedin.com/jobs/search/?keywords={keywords}&location={location}&start=0"
-    url = requests.utils.requote_uri(url)
-    driver.get(url)
-    scroll_to_bottom(driver, sleep_time)
-
-    # 6.2 Get number of results (jobs) and number pages (each page will contains 25 jobs)
-
-    # Parse the HTML content of the page using BeautifulSoup.
-    soup = BeautifulSoup(driver.page_source, "html.parser")
 
+def get_number_of_jobs(soup):
+    """Number of results of the search (0 if not found)."""
     try:
         div_number_of_jobs = soup.find(
             "div", {"class": "jobs-search-results-list__subtitle"}
@@ -139,44 +173,189 @@ def scraping_Job_Ids(
         )
     except:
         number_of_jobs = 0
+    return number_of_jobs
 
-    number_of_pages = math.ceil(number_of_jobs / 25)
-    print("number_of_jobs:", number_of_jobs)
-    print("number_of_pages:", number_of_pages)
 
-    # 6.3. Get Job Ids present on the first page.
-    Jobs_on_this_page = find_Job_Ids(soup)
-    List_Job_IDs.extend(Jobs_on_this_page)
+def scrape_results_page(driver, keywords, location, page_num, sleep_time=120):
+    """Open a page of the search results (25 jobs per page) and wait for the jobs.
+    Output:
+        - soup: the parsed HTML content of the page (BeautifulSoup).
+        - list of the Job Ids present on the page.
+        - timing metrics of the page (see wait_for_jobs).
+    """
+    url = SEARCH_URL.format(keywords, location, 25 * page_num)
+    url = requests.utils.requote_uri(url)
+    driver.get(url)
+    metrics = dict(page=page_num, **scroll_to_bottom(driver, sleep_time))
 
-    # Now that we've scraped the job IDs and number of results from the first page,
-    # let's iterate over the remaining pages (i.e. 2..number_of_pages).
+    # Parse the HTML content of the page using BeautifulSoup.
+    soup = BeautifulSoup(driver.page_source, "html.parser")
+    return soup, find_Job_Ids(soup), metrics
 
-    # 7. Iterate over the remaining pages
-    if number_of_pages > 1:
-        for page_num in range(1, number_of_pages):
-            print(f"Scraping page: {page_num}", end="...")
 
-            # Navigate to the first page (start=0)
-            url = f"https://www.linkedin.com/jobs/search/?keywords={keywords}&location={location}&start={25 * page_num}"
-            url = requests.utils.requote_uri(url)
+def scrape_results_pages(
+    driver, keywords, location, page_queue, results, sleep_time=120, progress=None
+):
+    """Worker: scrape the pages taken from page_queue until it is empty.
+    page_queue (queue.Queue): (page_num, number of failed attempts). A page that fails
+                              is put back in the queue, at most MAX_PAGE_RETRIES times.
+    results (dict): page_num --> (list of Job Ids, timing metrics).
+    progress (callable): called with the number of pages and Job Ids scraped so far."""
+    while True:
+        try:
+            page_num, nb_failures = page_queue.get_nowait()
+        except queue.Empty:
+            return
+        try:
+            _, Jobs_on_this_page, metrics = scrape_results_page(
+                driver, keywords, location, page_num, sleep_time
+            )
+        except Exception as e:
+            if nb_failures < MAX_PAGE_RETRIES:
+                print(f"Page {page_num} could not be scraped: {e} (retry later)")
+                page_queue.put((page_num, nb_failures + 1))
+                continue
+            print(f"Page {page_num} could not be scraped: {e}")
+            Jobs_on_this_page, metrics = [], dict(page=page_num, reason="error")
+        results[page_num] = (Jobs_on_this_page, metrics)
+        print(f"Scraping page: {page_num}...Jobs found:{len(Jobs_on_this_page)}")
+        if progress is not None:
+            progress(
+                pages=len(results),
+                job_ids=sum(len(Job_Ids) for Job_Ids, _ in list(results.values())),
+            )
+
 
-            driver.get(url)
-            scroll_to_bottom(driver, sleep_time)
+def scrape_results_pages_new_driver(
+    email_address,
+    password,
+    keywords,
+    location,
+    page_queue,
+    results,
+    chromedriver_path="../chromedriver/chromedriver.exe",
+    sleep_time=120,
+    headless=True,
+    progress=None,
+):
+    """Worker with its own browser: log in once, then scrape pages from page_queue."""
+    driver = create_driver(chromedriver_path, headless=headless)
+    try:
+        linkedin_login(driver, email_address, password, timeout=sleep_time)
+        scrape_results_pages(
+            driver, keywords, location, page_queue, results, sleep_time, progress
+        )
+    finally:
+        driver.quit()
 
-            # Parse the HTML content of the page using BeautifulSoup.
-            soup = BeautifulSoup(driver.page_source, "html.parser")
 
-            # Get Job Ids present on the first page.
-            Jobs_on_this_page = find_Job_Ids(soup)
-            List_Job_IDs.extend(Jobs_on_this_page)
-            print(f"Jobs found:{len(Jobs_on_this_page)}")
+def scraping_Job_Ids(
+    keywords,
+    location,
+    email_address,
+    password,
+    chromedriver_path="../chromedriver/chromedriver.exe",
+    sleep_time=120,
+    nb_workers=1,
+    headless=False,
+    progress=None,
+):
+    """Scrape linkedin Job Ids using selenium and BeautifulSoup
+    Inputs:
+    - keywords (str): the Job title
+    - location (str)
+    - email_address and password: user credentials
+    - chromedriver_path (str): path of the chromedriver
+    - sleep_time (seconds): maximum time to wait for a webpage to load (default= 120 seconds).
+                            If the 25 jobs are not loaded within this timer,
+                            we can adjust the time and test again.
+    - nb_workers (int): number of browsers scraping the pages in parallel
+                        (each browser logs in once).
+    - headless (bool): run the browsers without window (the extra workers are always headless).
+    - progress (callable): called with the number of pages and Job Ids scraped so far.
+    Output:
+    - list of the timing metrics of each page (see wait_for_jobs).
+    """
 
-    # 8. Save results (ie. Job IDs) to csv file
+    # 1. Instanciate the webdriver and sign in to Linkedin
+    driver = create_driver(chromedriver_path, headless=headless)
+    try:
+        linkedin_login(driver, email_address, password, timeout=sleep_time)
+
+        # 2. Scraping Linkedin Jobs IDs
+        ##############################################################################
+        # Set the search query parameters: Job title and location.
+        # Search results are displayed on many pages: `25` jobs are listed on each page.
+        # We will navigate to every page using the `start` parameter (0,25,50...)
+        # We need to scroll to the bottom of the page to load the full data.
+        # To get Job Ids, we will parse the HTML content of the page using BeautifulSoup.
+
+        # 2.1 Scrape the first page (start=0) and get the number of results (jobs)
+        # and number pages (each page will contains 25 jobs)
+        soup, Jobs_on_this_page, metrics = scrape_results_page(
+            driver, keywords, location, 0, sleep_time
+        )
+        number_of_jobs = get_number_of_jobs(soup)
+        number_of_pages = math.ceil(number_of_jobs / 25)
+        print("number_of_jobs:", number_of_jobs)
+        print("number_of_pages:", number_of_pages)
+        results = {0: (Jobs_on_this_page, metrics)}
+        if progress is not None:
+            progress(pages=1, job_ids=len(Jobs_on_this_page))
+
+        # 2.2 Scrape the remaining pages (i.e. 2..number_of_pages): the pages are taken
+        # from a queue by nb_workers browsers (this one and nb_workers-1 new ones).
+        page_queue = queue.Queue()
+        for page_num in range(1, number_of_pages):
+            page_queue.put((page_num, 0))
+
+        nb_workers = max(1, min(int(nb_workers), number_of_pages - 1))
+        with ThreadPoolExecutor(max_workers=nb_workers) as executor:
+            futures = [
+                executor.submit(
+                    scrape_results_pages_new_driver,
+                    email_address,
+                    password,
+                    keywords,
+                    location,
+                    page_queue,
+                    results,
+                    chromedriver_path,
+                    sleep_time,
+                    True,
+                    progress,
+                )
+                for _ in range(nb_workers - 1)
+            ]
+            scrape_results_pages(
+                driver, keywords, location, page_queue, results, sleep_time, progress
+            )
+            for future in futures:
+                try:
+                    future.result()
+                except TaskCancelled:  # raised by progress: stop the scraping
+                    raise
+                except Exception as e:  # e.g. login failed: the other workers took its pages
+                    print("A browser worker failed:", e)
+    finally:
+        # Close the browser and shut down the ChromiumDriver executable that
+        # is started when starting the ChromiumDriver.
+        driver.quit()
+
+    # 3. Job Ids in the order of the pages, without duplicates
+    # (a job can move from one page to the next one while we scrape).
+    List_Job_IDs = []
+    for page_num in sorted(results):
+        List_Job_IDs.extend(results[page_num][0])
+    List_Job_IDs = [Job_ID for Job_ID in dict.fromkeys(List_Job_IDs) if Job_ID]
+
+    # 4. Save results (ie. Job IDs) to csv file
     pd.DataFrame({"Job_Id": List_Job_IDs}).to_csv("../data/Job_Ids.csv", index=False)
 
-    ## 9. Close the browser and shut down the ChromiumDriver executable that
-    # is started when starting the ChromiumDriver.
-    driver.quit()
+    page_metrics = [results[page_num][1] for page_num in sorted(results)]
+    total_time = sum(metrics.get("elapsed", 0) for metrics in page_metrics)
+    print(f"Waited {total_time:.1f}s for {len(page_metrics)} pages.")
+    return page_metrics
 
 
 ##########################################################################
@@ -185,6 +364,25 @@ def scraping_Job_Ids(
 import requests
 from bs4 import BeautifulSoup
 
+from job_fetcher import (
+    JOB_URL,
+    SEARCH_URL as GUEST_SEARCH_URL,
+    create_session,
+    HostRateLimiter,
+    fetch_url,
+    fetch_job_postings,
+)
+from job_store import (
+    get_jobs_DF,
+    merge_jobs_DF,
+    open_staging,
+    commit_staged_jobs,
+    STAGING_PATH,
+    get_content_hash,
+    SeenJobsIndex,
+    SEEN_JOBS_PATH,
+)
+
 
 def remove_tags(html):
     """remove html tags from BeautifulSoup.text"""
@@ -200,91 +398,137 @@ def remove_tags(html):
     return " ".join(soup.stripped_strings)
 
 
-def scrape_Job_details():
-    """Scraping Job details using requests and BeautifulSoup
-    return pandas DataFrame containing Linkedin Job details
+# Html elements containing the Job details: (tag name, class attribute) --> column.
+JOB_DETAILS_ELEMENTS = {
+    ("div", "top-card-layout__card"): "company",
+    ("div", "top-card-layout__entity-info"): "job-title",
+    ("ul", "description__job-criteria-list"): "level",
+    ("span", "topcard__flavor topcard__flavor--bullet"): "location",
+    ("span", "posted-time-ago__text topcard__flavor--metadata"): "posted-time-ago",
+    (
+        "span",
+        "num-applicants__caption topcard__flavor--metadata topcard__flavor--bullet",
+    ): "nb_candidats",
+}
+
+# How to get each Job detail from its html element.
+JOB_DETAILS_GETTERS = {
+    "company": lambda tag: tag.find("a").find("img").get("alt"),
+    "job-title": lambda tag: tag.find("a").text.strip(),
+    "level": lambda tag: tag.find("li").text.replace("Seniority level", "").strip(),
+    "location": lambda tag: tag.text.strip(),
+    "posted-time-ago": lambda tag: tag.text.strip(),
+    "nb_candidats": lambda tag: int(tag.text.strip().split()[0]),
+}
+
+
+def parse_Job_posting(Job_ID, html):
+    """Parse the html of a Linkedin job posting (using BeautifulSoup and lxml).
+    The html is parsed once, and the tree is walked once to remove the style/script tags
+    and to collect the elements containing the Job details.
+    Returns a dict containing the Job details.
     """
-    list_job_IDs = pd.read_csv("../data/Job_Ids.csv").Job_Id.to_list()
-
-    job_url = "https://www.linkedin.com/jobs-guest/jobs/api/jobPosting/{}"
-
-    job = {}
-    list_jobs = []
-    for j in range(0, len(list_job_IDs)):
-        print(f"{j+1} ... read jobId:{list_job_IDs[j]}")
-
-        resp = requests.get(job_url.format(list_job_IDs[j]))
-        soup = BeautifulSoup(resp.text, "html.parser")
-        # print(soup.prettify())
-
-        job["Job_ID"] = list_job_IDs[j]
-        # try:
-        #     job["Job_html"] = resp.content
-        # except:
-        #     job["Job_html"]=None
-
-        try:  # remove tags
-            job["Job_txt"] = remove_tags(resp.content)
-        except:
-            job["Job_txt"] = None
-
-        try:
-            job["company"] = (
-                soup.find("div", {"class": "top-card-layout__card"})
-                .find("a")
-                .find("img")
-                .get("alt")
-            )
-        except:
-            job["company"] = None
-
-        try:
-            job["job-title"] = (
-                soup.find("div", {"class": "top-card-layout__entity-info"})
-                .find("a")
-                .text.strip()
-            )
-        except:
-            job["job-title"] = None
-
-        try:
-            job["level"] = (
-                soup.find("ul", {"class": "description__job-criteria-list"})
-                .find("li")
-                .text.replace("Seniority level", "")
-                .strip()
-            )
-        except:
-            job["level"] = None
+    soup = BeautifulSoup(html, "lxml")
+
+    # 1. Walk the tree: remove tags (style, script) and find the Job details elements
+    elements = {}
+    for tag in soup.find_all(True):
+        if tag.name in ("style", "script"):
+            tag.decompose()
+            continue
+        # like soup.find: match the whole class attribute or one of its classes
+        classes = tag.get("class", [])
+        for class_name in [" ".join(classes)] + classes:
+            column = JOB_DETAILS_ELEMENTS.get((tag.name, class_name))
+            if column is not None:
+                elements.setdefault(column, tag)
+
+    # 2. Get the Job details
+    job = {"Job_ID": Job_ID}
+    try:
+        job["Job_txt"] = " ".join(soup.stripped_strings)
+    except:
+        job["Job_txt"] = None
 
+    for column, get_value in JOB_DETAILS_GETTERS.items():
         try:
-            job["location"] = soup.find(
-                "span", {"class": "topcard__flavor topcard__flavor--bullet"}
-            ).text.strip()
+            job[column] = get_value(elements[column])
         except:
-            job["location"] = None
+            job[column] = None
 
-        try:
-            job["posted-time-ago"] = soup.find(
-                "span", {"class": "posted-time-ago__text topcard__flavor--metadata"}
-            ).text.strip()
-        except:
-            job["posted-time-ago"] = None
+    return job
 
-        try:
-            nb_candidats = soup.find(
-                "span",
-                {
-                    "class": "num-applicants__caption topcard__flavor--metadata topcard__flavor--bullet"
-                },
-            ).text.strip()
-            nb_candidats = int(nb_candidats.split()[0])
-            job["nb_candidats"] = nb_candidats
-        except:
-            job["nb_candidats"] = None
 
-        list_jobs.append(job)
-        job = {}
+def iter_Job_postings(
+    list_job_IDs,
+    job_url=JOB_URL,
+    max_workers=8,
+    requests_per_second=5,
+    max_retries=3,
+    backoff_factor=1.0,
+    progress=None,
+):
+    """Generator: download and parse the Linkedin job postings one by one
+    (dicts, see parse_Job_posting), in the order of list_job_IDs.
+    The postings that could not be downloaded are skipped.
+    Inputs: see scrape_Job_details.
+    """
+    nb_jobs = 0
+    for j, (Job_ID, html) in enumerate(
+        fetch_job_postings(
+            list_job_IDs,
+            job_url=job_url,
+            max_workers=max_workers,
+            requests_per_second=requests_per_second,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+        )
+    ):
+        print(f"{j+1} ... read jobId:{Job_ID}")
+        if html is None:  # all the attempts failed
+            print(f"jobId:{Job_ID} could not be downloaded.")
+            continue
+        job = parse_Job_posting(Job_ID, html)
+        nb_jobs += 1
+        if progress is not None:
+            progress(postings_fetched=nb_jobs)
+        yield job
+
+
+def scrape_Job_details(
+    list_job_IDs=None,
+    job_url=JOB_URL,
+    max_workers=8,
+    requests_per_second=5,
+    max_retries=3,
+    backoff_factor=1.0,
+    progress=None,
+):
+    """Scraping Job details using requests and BeautifulSoup
+    The job postings are downloaded concurrently over a pooled session (see job_fetcher.py).
+    Inputs:
+        - list_job_IDs (list): Job IDs to scrape (default: read ../data/Job_Ids.csv).
+        - job_url (str): url template of a job posting.
+        - max_workers (int): number of concurrent requests.
+        - requests_per_second (float): max requests per second sent to Linkedin.
+        - max_retries, backoff_factor: retry policy of failed requests.
+        - progress (callable): called with the number of postings downloaded so far.
+    return pandas DataFrame containing Linkedin Job details
+    """
+    if list_job_IDs is None:
+        list_job_IDs = pd.read_csv("../data/Job_Ids.csv").Job_Id.to_list()
+
+    list_jobs = list(
+        iter_Job_postings(
+            list_job_IDs,
+            job_url=job_url,
+            max_workers=max_workers,
+            requests_per_second=requests_per_second,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+            progress=progress,
+        )
+    )
 
     # create a pandas Datadrame
     jobs_DF = pd.DataFrame(list_jobs)
@@ -351,14 +595,20 @@ def get_posted_date(posted_time_ago, date_scraping):
     return posted_date
 
 
-def Preprocess_data(jobs_DF):
+def Preprocess_data(
+    jobs_DF, batch_size=256, n_process=1, extract_skills=True, progress=None
+):
     """
     Preprocess_data:
         # 1. Create a posted_date column using posted_time_ago
         # 2. Clean up columns: level and job_txt
-        # 3. Create column: skills
+        # 3. Create columns: skills and skill_spans (character offsets of the skills)
     Inputs:
         - jobs_DF (pandas DF): the pandas DF containg the scraped Linkedin Jobs.
+        - batch_size (int): number of Job descriptions sent to Spacy per batch.
+        - n_process (int): number of processes used by Spacy (-1: use all the CPUs).
+        - extract_skills (bool): if False, skip step 3 (no NLP).
+        - progress (callable): called with the number of postings processed.
     Output:
         - jobs_DF (pandas DF): updated DF.
 
@@ -376,19 +626,422 @@ def Preprocess_data(jobs_DF):
         else x
     )
 
+    if not extract_skills:
+        return jobs_DF
+
     # 3. Add/update column SKILLS
-    # Load Spacy model containing the skill entity ruler.
-    nlp_Spacy = Spacy_create_nlp()
+    # Load Spacy model containing the skill entity ruler (shared process-wide).
+    nlp_Spacy = get_nlp()
     print(nlp_Spacy.pipe_names)
 
-    jobs_DF["skills"] = (
-        jobs_DF["Job_txt"].str.lower().apply(lambda x: get_skills(nlp_Spacy, x))
+    # The character offsets of the skill entities (skill_spans) are stored with the
+    # job, so that the skills can be highlighted without running Spacy again.
+    jobs_DF["skills"], jobs_DF["skill_spans"] = get_skills_batch(
+        nlp_Spacy,
+        jobs_DF["Job_txt"].str.lower(),
+        batch_size=batch_size,
+        n_process=n_process,
+        return_spans=True,
     )
     jobs_DF["skills"] = jobs_DF["skills"].apply(unique_skills)
+    # offsets of the lowercase text are only valid if lower() kept the same length
+    same_length = jobs_DF["Job_txt"].str.len() == jobs_DF["Job_txt"].str.lower().str.len()
+    jobs_DF["skill_spans"] = jobs_DF["skill_spans"].where(same_length, None)
+
+    if progress is not None:
+        progress(postings_processed=len(jobs_DF))
+
+    return jobs_DF
+
+
+##########################################################################
+#           IV- Incremental scraping
+##########################################################################
+# Daily re-scrapes of the same searches mostly find jobs we already have.
+# A persistent index (SeenJobsIndex) keeps, for each Job ID, the time of its last
+# download and a hash of its description:
+# 1. only the new Job IDs and the stale ones (older than refresh_days) are downloaded;
+# 2. Spacy only runs on the descriptions that changed (the others keep their skills);
+# 3. the jobs are merged into the job store (same Job_ID: replaced).
+# In batch mode (several queries), the jobs are also tagged with their queries.
+
+
+def update_jobs_incremental(
+    list_job_IDs=None,
+    refresh_days=7,
+    seen_jobs_path=SEEN_JOBS_PATH,
+    job_url=JOB_URL,
+    max_workers=8,
+    requests_per_second=5,
+    batch_size=256,
+    Job_queries=None,
+    progress=None,
+):
+    """Scrape only the new or stale Linkedin jobs and merge them into the job store.
+    Inputs:
+        - list_job_IDs (list): Job IDs found by the search (default: read ../data/Job_Ids.csv).
+        - refresh_days (float): download again the jobs downloaded more than refresh_days ago.
+        - seen_jobs_path (str): json file of the index of the Job IDs already scraped.
+        - job_url, max_workers, requests_per_second: see scrape_Job_details.
+        - batch_size (int): number of Job descriptions sent to Spacy per batch.
+        - Job_queries (dict): Job_ID --> queries that found the job (see tag_jobs_queries).
+        - progress (callable): called with the numbers of postings downloaded and processed.
+    Output:
+        - jobs_DF (pandas DF): the downloaded (or newly tagged) jobs, merged into the job store.
+    """
+    if list_job_IDs is None:
+        list_job_IDs = pd.read_csv("../data/Job_Ids.csv").Job_Id.to_list()
+    list_job_IDs = list(dict.fromkeys(list_job_IDs))  # remove duplicates
+
+    seen_jobs = SeenJobsIndex(seen_jobs_path)
+    if len(seen_jobs) == 0:  # first run: index the jobs already stored
+        seen_jobs.add_jobs(get_jobs_DF(columns=["Job_ID", "Job_txt", "scraping_date"]))
+
+    # 1. Download only the new or stale jobs
+    list_job_IDs = [
+        Job_ID
+        for Job_ID in list_job_IDs
+        if seen_jobs.is_stale(Job_ID, refresh_days * 24 * 3600)
+    ]
+    print(f"{len(list_job_IDs)} new or stale Job IDs to scrape.")
+
+    jobs_DF = pd.DataFrame()
+    if len(list_job_IDs) > 0:
+        jobs_DF = scrape_Job_details(
+            list_job_IDs,
+            job_url=job_url,
+            max_workers=max_workers,
+            requests_per_second=requests_per_second,
+            progress=progress,
+        )
+
+    # 2. Run Spacy only on the new or changed descriptions
+    content_hashes = {}
+    if not jobs_DF.empty:
+        content_hashes = {
+            Job_ID: get_content_hash(clean_Job_description(Job_txt))
+            for Job_ID, Job_txt in zip(jobs_DF["Job_ID"], jobs_DF["Job_txt"])
+        }
+        stored_DF = get_jobs_DF(columns=["Job_ID", "skills", "skill_spans"])
+        stored_DF = stored_DF.drop_duplicates("Job_ID", keep="last").set_index("Job_ID")
+        changed = np.array(
+            [
+                seen_jobs.has_changed(Job_ID, content_hashes[Job_ID])
+                or Job_ID not in stored_DF.index
+                for Job_ID in jobs_DF["Job_ID"]
+            ],
+            dtype=bool,
+        )
+        print(f"{changed.sum()} new or changed job descriptions.")
+
+        list_DFs = []
+        if changed.any():
+            list_DFs.append(Preprocess_data(jobs_DF[changed].copy(), batch_size=batch_size))
+        if not changed.all():
+            unchanged_DF = Preprocess_data(jobs_DF[~changed].copy(), extract_skills=False)
+            for column in ["skills", "skill_spans"]:  # keep the skills already extracted
+                if column in stored_DF.columns:
+                    unchanged_DF[column] = unchanged_DF["Job_ID"].map(stored_DF[column])
+            list_DFs.append(unchanged_DF)
+        jobs_DF = pd.concat(list_DFs, ignore_index=True)
+        if progress is not None:
+            progress(postings_processed=len(jobs_DF))
+
+    # 3. Tag the jobs with the queries that found them (batch mode)
+    if Job_queries is not None:
+        jobs_DF = tag_jobs_queries(jobs_DF, Job_queries, stored_DF=get_jobs_DF())
+    if jobs_DF.empty:
+        return jobs_DF
+
+    # 4. Merge into the job store, then update the index
+    merge_jobs_DF(jobs_DF)
+    fetched_at = time.time()
+    for Job_ID, content_hash in content_hashes.items():
+        seen_jobs.update(Job_ID, content_hash, fetched_at)
+    seen_jobs.save()
 
     return jobs_DF
 
 
+##########################################################################
+#           V- Scraping Linkedin Jobs IDs over HTTP (no browser)
+##########################################################################
+# The public guest search API returns the search results as html (no login,
+# no selenium): each job card has a data-entity-urn="urn:li:jobPosting:<Job_ID>".
+# We page through the results with the `start` parameter until a page is empty.
+
+
+def find_Job_Ids_guest(soup):
+    """Parse a page of the guest search API (BeautifulSoup) and find Job Ids"""
+    Job_Ids_on_the_page = []
+
+    for job_card in soup.find_all(attrs={"data-entity-urn": True}):
+        urn = job_card.get("data-entity-urn")
+        if urn.startswith("urn:li:jobPosting:"):
+            Job_Ids_on_the_page.append(urn.rsplit(":", 1)[1])
+
+    return Job_Ids_on_the_page
+
+
+def scraping_Job_Ids_guest(
+    keywords,
+    location,
+    search_url=GUEST_SEARCH_URL,
+    max_jobs=1000,
+    requests_per_second=2,
+    max_retries=3,
+    backoff_factor=1.0,
+    progress=None,
+    job_ids_path="../data/Job_Ids.csv",
+):
+    """Scrape linkedin Job Ids with requests, using the guest search API.
+    Inputs:
+    - keywords (str): the Job title
+    - location (str)
+    - search_url (str): url template of a page of results (use a local server for testing).
+    - max_jobs (int): stop after max_jobs Job Ids.
+    - requests_per_second, max_retries, backoff_factor: see job_fetcher.fetch_url.
+    - progress (callable): called with the number of pages and Job Ids scraped so far.
+    - job_ids_path (str): csv file where the Job Ids are saved.
+    Output:
+    - list of the Job Ids (also saved to job_ids_path)
+    """
+    session = create_session(pool_size=1)
+    rate_limiter = HostRateLimiter(requests_per_second)
+
+    List_Job_IDs = []
+    seen_Job_IDs = set()
+    start, nb_pages = 0, 0
+    while len(List_Job_IDs) < max_jobs:
+        url = requests.utils.requote_uri(search_url.format(keywords, location, start))
+        html = fetch_url(
+            session,
+            url,
+            rate_limiter=rate_limiter,
+            max_retries=max_retries,
+            backoff_factor=backoff_factor,
+        )
+        if html is None:  # all the attempts failed
+            print(f"Page start={start} could not be downloaded.")
+            break
+
+        Jobs_on_this_page = find_Job_Ids_guest(BeautifulSoup(html, "lxml"))
+        new_Job_IDs = [
+            Job_ID
+            for Job_ID in dict.fromkeys(Jobs_on_this_page)
+            if Job_ID not in seen_Job_IDs
+        ]
+        print(f"Scraping results start={start}...Jobs found:{len(Jobs_on_this_page)}")
+        if len(new_Job_IDs) == 0:  # last page
+            break
+        List_Job_IDs.extend(new_Job_IDs)
+        seen_Job_IDs.update(new_Job_IDs)
+        start += len(Jobs_on_this_page)
+        nb_pages += 1
+        if progress is not None:
+            progress(pages=nb_pages, job_ids=len(List_Job_IDs))
+
+    session.close()
+    List_Job_IDs = List_Job_IDs[:max_jobs]
+
+    # Save results (ie. Job IDs) to csv file
+    pd.DataFrame({"Job_Id": List_Job_IDs}).to_csv(job_ids_path, index=False)
+    return List_Job_IDs
+
+
+##########################################################################
+#           VI- Batch scraping of several queries
+##########################################################################
+# Overlapping searches ("data scientist", "ML engineer", "data analyst"...) find
+# many identical jobs. In batch mode, the Job Ids of all the queries are collected
+# first and de-duplicated, so that each job is downloaded (and analysed) once.
+# Each job is tagged (column queries) with all the queries that found it.
+
+
+def get_query_name(keywords, location):
+    return f"{keywords} | {location}"
+
+
+def add_queries(queries, new_queries):
+    """Union of two lists of queries (keeps the order)."""
+    if not isinstance(queries, list):  # jobs scraped before the column queries existed
+        queries = []
+    return list(dict.fromkeys(queries + list(new_queries)))
+
+
+def tag_jobs_queries(jobs_DF, Job_queries, stored_DF=None):
+    """Add the column queries to jobs_DF: the queries that found each job.
+    Inputs:
+        - jobs_DF (pandas DF): scraped jobs.
+        - Job_queries (dict): Job_ID --> list of queries (see get_query_name).
+        - stored_DF (pandas DF): jobs already stored (optional). Their queries are kept,
+          and the stored jobs found by new queries are added to jobs_DF (to be merged).
+    Output:
+        - jobs_DF (pandas DF) with the column queries.
+    """
+    stored_queries = {}
+    if stored_DF is not None and not stored_DF.empty:
+        stored_DF = stored_DF.drop_duplicates("Job_ID", keep="last")
+        if "queries" in stored_DF.columns:
+            stored_queries = dict(zip(stored_DF["Job_ID"], stored_DF["queries"]))
+
+        # stored jobs (not downloaded again) found by new queries
+        Job_IDs = jobs_DF["Job_ID"] if "Job_ID" in jobs_DF.columns else []
+        found_DF = stored_DF[
+            stored_DF["Job_ID"].isin(Job_queries.keys()) & ~stored_DF["Job_ID"].isin(Job_IDs)
+        ]
+        has_new_queries = [
+            not set(Job_queries[Job_ID]).issubset(
+                add_queries(stored_queries.get(Job_ID), [])
+            )
+            for Job_ID in found_DF["Job_ID"]
+        ]
+        jobs_DF = pd.concat([jobs_DF, found_DF[has_new_queries]], ignore_index=True)
+
+    if jobs_DF.empty:
+        return jobs_DF
+    jobs_DF["queries"] = [
+        add_queries(stored_queries.get(Job_ID), Job_queries.get(Job_ID, []))
+        for Job_ID in jobs_DF["Job_ID"]
+    ]
+    return jobs_DF
+
+
+def discover_Job_Ids(
+    keywords,
+    location,
+    discovery="selenium",
+    credentials=None,
+    chrome_driver_path="../chromedriver/chromedriver.exe",
+    sleep_time=120,
+    nb_workers=1,
+    headless=False,
+    progress=None,
+):
+    """Find the Job Ids of a search (also saved to ../data/Job_Ids.csv).
+    Inputs:
+        - discovery (str): "selenium" (see scraping_Job_Ids) or "guest" (see scraping_Job_Ids_guest).
+        - credentials (tuple): (email_address, password) used by selenium
+                               (default: read ../data/user_credentials.txt).
+        - chrome_driver_path, sleep_time, nb_workers, headless, progress: see scraping_Job_Ids.
+    Output:
+        - list of the Job Ids (int).
+    """
+    # update keywords, location (encode specieal caracters like comma)
+    keywords = keywords.replace(",", "%2C")
+    location = location.replace(",", "%2C")
+
+    if discovery == "guest":
+        list_job_IDs = scraping_Job_Ids_guest(keywords, location, progress=progress)
+    else:
+        if credentials is None:
+            credentials = get_user_credentials()
+        email_address, password = credentials
+        scraping_Job_Ids(
+            keywords,
+            location,
+            email_address,
+            password,
+            chromedriver_path=chrome_driver_path,
+            sleep_time=sleep_time,
+            nb_workers=nb_workers,
+            headless=headless,
+            progress=progress,
+        )
+        list_job_IDs = pd.read_csv("../data/Job_Ids.csv").Job_Id.to_list()
+
+    return [int(Job_ID) for Job_ID in list_job_IDs]
+
+
+##########################################################################
+#           VII- Streaming pipeline: download --> parse --> skills --> storage
+##########################################################################
+# The postings flow through the pipeline by chunks of `chunk_size` jobs:
+# each chunk is downloaded, parsed, cleaned, analysed with Spacy and written to the
+# staging area (parquet) before the next one, and the staging area is stored at the
+# end. The memory used while scraping does not depend on the number of jobs. If the
+# scraping stops, the chunks already written are kept in the staging area and the
+# same scraping started again only downloads the remaining jobs.
+# Storing the jobs at the end loads them all in memory with the json backend (the json
+# file is written once) or with replace=False (merge): use STORAGE_BACKEND = "parquet"
+# and replace=True for a memory use that stays flat.
+
+
+def iter_batches(iterable, batch_size):
+    """Split an iterable into lists of at most batch_size items."""
+    iterator = iter(iterable)
+    while True:
+        batch = list(itertools.islice(iterator, batch_size))
+        if len(batch) == 0:
+            return
+        yield batch
+
+
+def scrape_and_store_jobs(
+    list_job_IDs=None,
+    chunk_size=100,
+    replace=True,
+    job_url=JOB_URL,
+    max_workers=8,
+    requests_per_second=5,
+    batch_size=256,
+    tag_jobs=None,
+    progress=None,
+    staging_path=STAGING_PATH,
+):
+    """Scrape, preprocess and store the Linkedin jobs by chunks (streaming).
+    Inputs:
+        - list_job_IDs (iterable): Job IDs to scrape (default: read ../data/Job_Ids.csv).
+        - chunk_size (int): number of jobs preprocessed and written at once.
+        - replace (bool): the scraped jobs replace the stored jobs (False: they are merged,
+                          the stored jobs with the same Job_ID are replaced).
+                          The jobs are stored once the scraping is over (see open_staging):
+                          a scraping that stopped is resumed when it is started again.
+        - job_url, max_workers, requests_per_second: see scrape_Job_details.
+        - batch_size (int): number of Job descriptions sent to Spacy per batch.
+        - tag_jobs (callable): optional function applied to each preprocessed chunk
+                               (pandas DF), e.g. to add the queries of the jobs.
+        - progress (callable): called with the numbers of postings downloaded and processed.
+        - staging_path (str): directory of the staging area (parquet).
+    Output:
+        - number of jobs stored.
+    """
+    if list_job_IDs is None:
+        list_job_IDs = pd.read_csv("../data/Job_Ids.csv").Job_Id.to_list()
+
+    # The chunks are written to a staging area (parquet parts, appended without
+    # rewriting the previous chunks) and stored at the end: if the scraping is
+    # cancelled or fails, the stored jobs are unchanged and the staged jobs are kept.
+    list_job_IDs = list(list_job_IDs)
+    staging, staged_IDs = open_staging(list_job_IDs, staging_path)
+    if staged_IDs:
+        print(f"Resume the scraping: {len(staged_IDs)} jobs already staged.")
+        list_job_IDs = [Job_ID for Job_ID in list_job_IDs if str(Job_ID) not in staged_IDs]
+    nb_jobs = len(staged_IDs)
+    postings = iter_Job_postings(
+        list_job_IDs,
+        job_url=job_url,
+        max_workers=max_workers,
+        requests_per_second=requests_per_second,
+        progress=progress,
+    )
+    for list_jobs in iter_batches(postings, chunk_size):
+        jobs_DF = Preprocess_data(pd.DataFrame(list_jobs), batch_size=batch_size)
+        if tag_jobs is not None:
+            jobs_DF = tag_jobs(jobs_DF)
+
+        staging.append(jobs_DF)
+        nb_jobs += len(jobs_DF)
+        print(f"{nb_jobs} jobs scraped.")
+        if progress is not None:
+            progress(postings_processed=nb_jobs)
+
+    if nb_jobs > 0:
+        commit_staged_jobs(staging, replace=replace)
+        print(f"{nb_jobs} jobs stored.")
+    return nb_jobs
+
+
 #################################################################
 ########        Main function
 #################################################################
@@ -399,6 +1052,12 @@ def scraping_main(
     location,
     chrome_driver_path="../chromedriver/chromedriver.exe",
     sleep_time=120,
+    incremental=False,
+    refresh_days=7,
+    nb_workers=1,
+    headless=False,
+    discovery="selenium",
+    progress=None,
 ):
     """
     Scraping Linkedin Jobs using selenium, requests and BeautifulSoup.
@@ -409,57 +1068,168 @@ def scraping_main(
         - sleep_time (seconds): provide extra time for the webpage to load (default= 120 seconds).
                                 If the 25 jobs are not loaded within this timer,
                                 we can adjust the time and test again.
+        - incremental (bool): only scrape the new or stale jobs and merge them
+                              into the stored jobs (see update_jobs_incremental).
+        - refresh_days (float): incremental mode: jobs older than this are scraped again.
+        - nb_workers (int): number of browsers scraping the pages of results in parallel.
+        - headless (bool): run the browsers without window.
+        - discovery (str): how the Job Ids are found: "selenium" (signed in browsers)
+                           or "guest" (guest search API over HTTP: no browser, no login).
+        - progress (callable): called with the progress counters (pages, job_ids,
+                               postings_fetched, postings_processed), e.g. by a background task.
     """
 
-    # 1. update keywords, location (encode specieal caracters like comma)
-    print("1. update keywords, location (encode specieal caracters like comma)...\n\n")
-    keywords = keywords.replace(",", "%2C")
-    location = location.replace(",", "%2C")
-
-    # 2. Get user credentials (to sign in to Linkedin)
-    print("2. Get user credentials...\n\n")
-    email_address, password = get_user_credentials()
-
-    # 3. Scraping Job_Ids with selenium and BeautifulSoup
-    print("2. Scraping Job_Ids with selenium and BeautifulSoup ...\n\n")
-    scraping_Job_Ids(
+    # 1-3. Scraping Job_Ids: with selenium and BeautifulSoup (sign in with the user
+    # credentials), or with requests (guest search API)
+    print(f"1. Scraping Job_Ids ({discovery}) ...\n\n")
+    discover_Job_Ids(
         keywords,
         location,
-        email_address,
-        password,
-        chromedriver_path=chrome_driver_path,
+        discovery=discovery,
+        chrome_driver_path=chrome_driver_path,
         sleep_time=sleep_time,
+        nb_workers=nb_workers,
+        headless=headless,
+        progress=progress,
     )
 
-    # 4. Scraping Job description using Requests and BeautifulSoup
+    if incremental:
+        # 4-6. Scrape, preprocess and merge only the new or stale jobs
+        print("Incremental scraping of the new or stale jobs...\n\n")
+        update_jobs_incremental(refresh_days=refresh_days, progress=progress)
+        print("Scraping Linkedin Jobs: done.\n")
+        return
+
+    # 4-6. Scraping Job description using Requests and BeautifulSoup, preprocess
+    # data and save the jobs, by chunks (streaming pipeline)
     print("Scraping Job description using requests and BeautifulSoup...\n\n")
-    jobs_DF = scrape_Job_details()
+    scrape_and_store_jobs(progress=progress)
 
-    # 5. Preprocess data
-    print("Preprocess data...\n\n")
-    jobs_DF = pd.read_json(
-        "../data/linkedin_jobs_scraped.json",
-        convert_dates=["posted_date", "scraping_date"],
-    )
-    jobs_DF = Preprocess_data(jobs_DF)
+    print("Scraping Linkedin Jobs: done.\n")
 
-    # 6. Save jobs_DF to json file
-    print("Save jobs_DF to json file\n\n")
-    jobs_DF.to_json("../data/linkedin_jobs_scraped.json")
+
+def scraping_batch_main(
+    queries_path,
+    chrome_driver_path="../chromedriver/chromedriver.exe",
+    sleep_time=120,
+    incremental=False,
+    refresh_days=7,
+    nb_workers=1,
+    headless=False,
+    discovery="selenium",
+    progress=None,
+):
+    """
+    Scraping the Linkedin Jobs of several queries (searches).
+    The Job Ids of all the queries are de-duplicated before downloading the jobs,
+    and each job is tagged (column queries) with the queries that found it.
+    Inputs
+        - queries_path (str): csv file with the columns keywords and location (one query per row).
+        - other inputs: see scraping_main (progress also gets the number of queries done).
+    """
+    # 1. Find the Job Ids of each query
+    queries_DF = pd.read_csv(queries_path)
+    credentials = None
+    if discovery != "guest":
+        credentials = get_user_credentials()
+
+    Job_queries = {}  # Job_ID --> queries that found the job (in the order of the queries)
+    for k, (keywords, location) in enumerate(
+        zip(queries_DF["keywords"], queries_DF["location"])
+    ):
+        query = get_query_name(keywords, location)
+        print(f"1. Scraping Job_Ids of query {k+1}/{len(queries_DF)}: {query}\n\n")
+        list_job_IDs = discover_Job_Ids(
+            keywords,
+            location,
+            discovery=discovery,
+            credentials=credentials,
+            chrome_driver_path=chrome_driver_path,
+            sleep_time=sleep_time,
+            nb_workers=nb_workers,
+            headless=headless,
+            progress=progress,
+        )
+        for Job_ID in list_job_IDs:
+            Job_queries[Job_ID] = add_queries(Job_queries.get(Job_ID), [query])
+        if progress is not None:
+            progress(queries=k + 1, unique_job_ids=len(Job_queries))
+
+    # 2. Job Ids of all the queries, without duplicates
+    list_job_IDs = list(Job_queries)
+    print(f"{len(list_job_IDs)} unique Job_Ids found by {len(queries_DF)} queries.\n\n")
+    pd.DataFrame({"Job_Id": list_job_IDs}).to_csv("../data/Job_Ids.csv", index=False)
+
+    if incremental:
+        # 3-5. Scrape, preprocess and merge only the new or stale jobs
+        update_jobs_incremental(
+            list_job_IDs,
+            refresh_days=refresh_days,
+            Job_queries=Job_queries,
+            progress=progress,
+        )
+        print("Scraping Linkedin Jobs: done.\n")
+        return
+
+    # 3-5. Scraping Job description, preprocess data, tag the jobs with their
+    # queries and save them, by chunks (streaming pipeline)
+    print("Scraping Job description using requests and BeautifulSoup...\n\n")
+    scrape_and_store_jobs(
+        list_job_IDs,
+        tag_jobs=lambda jobs_DF: tag_jobs_queries(jobs_DF, Job_queries),
+        progress=progress,
+    )
 
     print("Scraping Linkedin Jobs: done.\n")
 
 
 def main():
-    if len(sys.argv) == 4:
-        keywords, location, sleep_time_ = sys.argv[1:]
-        scraping_main(keywords, location, sleep_time=sleep_time_)
+    parser = argparse.ArgumentParser(
+        description="Scrape Linkedin jobs.",
+        epilog='Example: python scraping_linkedin.py "data scientist" "Montreal, Quebec, Canada" 120\n'
+        "Batch of queries: python scraping_linkedin.py --queries ../data/queries.csv",
+        formatter_class=argparse.RawDescriptionHelpFormatter,
+    )
+    parser.add_argument("keywords", nargs="?", help="the Job title")
+    parser.add_argument("location", nargs="?")
+    parser.add_argument(
+        "sleep_time",
+        nargs="?",
+        type=float,
+        default=120,
+        help="maximum time (seconds) to wait for a webpage",
+    )
+    parser.add_argument(
+        "--queries", help="csv file of queries (columns: keywords, location)"
+    )
+    parser.add_argument(
+        "--incremental", action="store_true", help="only scrape the new or stale jobs"
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="number of browsers scraping in parallel"
+    )
+    parser.add_argument("--headless", action="store_true", help="browsers without window")
+    parser.add_argument(
+        "--discovery",
+        choices=["selenium", "guest"],
+        default="selenium",
+        help="find the Job Ids with selenium (login) or the guest search API (no browser)",
+    )
+    args = parser.parse_args()
+
+    options = dict(
+        sleep_time=args.sleep_time,
+        incremental=args.incremental,
+        nb_workers=args.workers,
+        headless=args.headless,
+        discovery=args.discovery,
+    )
+    if args.queries is not None:
+        scraping_batch_main(args.queries, **options)
+    elif args.keywords is not None and args.location is not None:
+        scraping_main(args.keywords, args.location, **options)
     else:
-        print(
-            "Please provide the Keywords and location."
-            "\nExample:\n"
-            'python scraping_linkedin.py "data scientist" "Montreal, Quebec, Canada" 120'
-        )
+        parser.error("Please provide the Keywords and location (or --queries).")
 
 
 if __name__ == "__main__":
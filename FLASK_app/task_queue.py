@@ -0,0 +1,162 @@
+import itertools
+import queue
+import threading
+import time
+import traceback
+import uuid
+
+import warnings
+
+warnings.filterwarnings("ignore")
+
+
+class TaskCancelled(Exception):
+    """Raised inside a task when it has been cancelled (see Task.report_progress)."""
+
+
+##########################################################################
+#     I- Task
+##########################################################################
+
+
+class Task:
+    """A function run in the background by a TaskQueue.
+    status: "queued", "running", "done", "failed" or "cancelled".
+    progress: counters reported by the function (e.g. pages, job_ids, postings_fetched).
+    """
+
+    def __init__(self, func, args, kwargs, name=""):
+        self.id = uuid.uuid4().hex[:12]
+        self.name = name
+        self.func, self.args, self.kwargs = func, args, kwargs
+        self.status = "queued"
+        self.progress = {}
+        self.error = None
+        self.result = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self._cancel_event = threading.Event()
+        self._lock = threading.Lock()
+
+    def report_progress(self, **counters):
+        """Update the progress counters (called by the function).
+        Raises TaskCancelled if the task was cancelled: the function stops there."""
+        with self._lock:
+            self.progress.update(counters)
+        if self._cancel_event.is_set():
+            raise TaskCancelled()
+
+    def cancel(self):
+        """Ask the task to stop (a queued task will not run)."""
+        self._cancel_event.set()
+
+    def is_cancelled(self):
+        return self._cancel_event.is_set()
+
+    def run(self):
+        if self.is_cancelled():
+            self.status = "cancelled"
+            self.finished_at = time.time()
+            return
+        self.status = "running"
+        self.started_at = time.time()
+        try:
+            self.result = self.func(
+                *self.args, progress=self.report_progress, **self.kwargs
+            )
+            self.status = "done"
+        except TaskCancelled:
+            self.status = "cancelled"
+        except Exception as e:
+            self.status = "failed"
+            self.error = f"{type(e).__name__}: {e}"
+            traceback.print_exc()
+        self.finished_at = time.time()
+
+    def to_dict(self):
+        """Status of the task (json serializable)."""
+        with self._lock:
+            progress = dict(self.progress)
+        elapsed = None
+        if self.started_at is not None:
+            elapsed = round((self.finished_at or time.time()) - self.started_at, 1)
+        return {
+            "task_id": self.id,
+            "name": self.name,
+            "status": self.status,
+            "progress": progress,
+            "error": self.error,
+            "elapsed": elapsed,
+        }
+
+
+##########################################################################
+#     II- Task queue
+##########################################################################
+
+
+class TaskQueue:
+    """In-process queue of background tasks, run by `nb_workers` worker threads.
+    The function of a task must accept a `progress` keyword argument: a callable
+    reporting progress counters, e.g. progress(pages=3), which also stops the function
+    (TaskCancelled) when the task is cancelled.
+    Only the last `max_finished` finished tasks are kept.
+    """
+
+    def __init__(self, nb_workers=1, max_finished=100):
+        self.max_finished = max_finished
+        self._queue = queue.Queue()
+        self._tasks = {}  # task id --> Task (in the order of submission)
+        self._lock = threading.Lock()
+        self._workers = []
+        for k in range(nb_workers):
+            worker = threading.Thread(
+                target=self._work, name=f"task-worker-{k}", daemon=True
+            )
+            worker.start()
+            self._workers.append(worker)
+
+    def _work(self):
+        while True:
+            task = self._queue.get()
+            task.run()
+            self._queue.task_done()
+            self._forget_finished()
+
+    def _forget_finished(self):
+        with self._lock:
+            finished = [
+                task_id
+                for task_id, task in self._tasks.items()
+                if task.finished_at is not None
+            ]
+            for task_id in itertools.islice(
+                finished, max(0, len(finished) - self.max_finished)
+            ):
+                del self._tasks[task_id]
+
+    def submit(self, func, *args, name="", **kwargs):
+        """Queue func(*args, progress=..., **kwargs); return the task id."""
+        task = Task(func, args, kwargs, name=name)
+        with self._lock:
+            self._tasks[task.id] = task
+        self._queue.put(task)
+        return task.id
+
+    def get(self, task_id):
+        """Return the task whose id is task_id, or None."""
+        with self._lock:
+            return self._tasks.get(task_id)
+
+    def cancel(self, task_id):
+        """Cancel a task; return False if the task does not exist or already finished."""
+        task = self.get(task_id)
+        if task is None or task.finished_at is not None:
+            return False
+        task.cancel()
+        return True
+
+    def list_tasks(self):
+        with self._lock:
+            return list(self._tasks.values())